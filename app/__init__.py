@@ -9,5 +9,9 @@ def create_app():
     # Register blueprints here
     from app.routes import main
     app.register_blueprint(main)
+
+    from app.llm_client import llm_client, LLM_PREWARM
+    if LLM_PREWARM:
+        llm_client.prewarm()
     
     return app 
\ No newline at end of file
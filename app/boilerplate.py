@@ -0,0 +1,40 @@
+import re
+
+
+def _normalize_line(line):
+    return re.sub(r'\s+', ' ', line).strip().lower()
+
+
+class BoilerplateFilter:
+    """
+    Drops content lines already emitted by an earlier page of the same crawl.
+
+    Navigation menus, footers and cookie banners repeat on every page; the first page
+    keeps them once so the site structure is still visible, later pages contribute
+    only their unique lines. Lines are compared without their element type prefix, so
+    a menu entry emitted as "LI: Pricing" on one page and "SPAN: Pricing" on another
+    is still recognised.
+    """
+
+    def __init__(self):
+        self._seen = set()
+        self.lines_dropped = 0
+
+    @staticmethod
+    def _key(line):
+        _, separator, text = line.partition(': ')
+        return _normalize_line(text if separator else line)
+
+    def filter(self, lines):
+        """
+        Return the lines not seen before in this crawl and remember them
+        """
+        unique_lines = []
+        for line in lines:
+            key = self._key(line)
+            if not key or key in self._seen:
+                self.lines_dropped += 1
+                continue
+            self._seen.add(key)
+            unique_lines.append(line)
+        return unique_lines
@@ -0,0 +1,107 @@
+import re
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+# Constants
+TRACKING_PARAMS = {
+    'gclid', 'gclsrc', 'dclid', 'fbclid', 'msclkid', 'yclid', 'twclid', 'igshid', 'ttclid',
+    'mc_cid', 'mc_eid', '_ga', '_gl', '_hsenc', '_hsmi', 'mkt_tok', 'ref_src', 'srsltid',
+}
+TRACKING_PARAM_PREFIXES = ('utm_', 'hsa_', 'pk_', 'mtm_')
+INDEX_FILES = {
+    'index.html', 'index.htm', 'index.php', 'index.asp', 'index.aspx', 'index.jsp',
+    'default.asp', 'default.aspx', 'default.htm', 'default.html',
+}
+DEFAULT_PORTS = {'http': '80', 'https': '443'}
+SHINGLE_SIZE = 8  # Characters per shingle; language agnostic, so it also works for Japanese
+NEAR_DUPLICATE_THRESHOLD = 0.9  # Jaccard similarity above which a page counts as a duplicate
+CONTENT_PREFIX_PATTERN = re.compile(r'^(H1|H2|H3|P|LI|SPAN): ', re.MULTILINE)
+
+
+def _is_tracking_param(name):
+    name = name.lower()
+    return name in TRACKING_PARAMS or name.startswith(TRACKING_PARAM_PREFIXES)
+
+
+def _clean_query(query):
+    params = [(name, value) for name, value in parse_qsl(query, keep_blank_values=True) if not _is_tracking_param(name)]
+    return urlencode(sorted(params))
+
+
+def _clean_netloc(scheme, netloc):
+    netloc = netloc.lower()
+    host, _, port = netloc.rpartition(':')
+    if host and port == DEFAULT_PORTS.get(scheme):
+        return host
+    return netloc
+
+
+def canonicalize_url(url):
+    """
+    Fetchable canonical form of a URL: lowercase scheme and host, no default port,
+    no fragment, no tracking parameters, sorted query
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    return urlunsplit((
+        scheme,
+        _clean_netloc(scheme, parts.netloc),
+        parts.path or '/',
+        _clean_query(parts.query),
+        ''
+    ))
+
+
+def url_identity(url):
+    """
+    Key identifying the page behind a URL regardless of scheme, www prefix,
+    trailing slash, default index file, fragment and tracking parameters
+    """
+    parts = urlsplit(canonicalize_url(url))
+    host = parts.netloc
+    if host.startswith('www.'):
+        host = host[4:]
+    segments = [segment for segment in parts.path.split('/') if segment]
+    if segments and segments[-1].lower() in INDEX_FILES:
+        segments.pop()
+    path = '/' + '/'.join(segments)
+    return f"{host}{path}?{parts.query}" if parts.query else f"{host}{path}"
+
+
+def content_shingles(content):
+    """
+    Set of hashed character shingles of page content, ignoring the element type prefixes
+    """
+    text = CONTENT_PREFIX_PATTERN.sub('', content)
+    text = re.sub(r'\s+', ' ', text).strip().lower()
+    if len(text) <= SHINGLE_SIZE:
+        return {hash(text)} if text else set()
+    return {hash(text[i:i + SHINGLE_SIZE]) for i in range(len(text) - SHINGLE_SIZE + 1)}
+
+
+class NearDuplicateDetector:
+    """
+    Flags page content that is nearly identical to content already accepted in a crawl.
+
+    With at most a handful of pages per crawl, exact Jaccard similarity over the
+    shingle sets is both cheaper and more precise than SimHash/MinHash sketches.
+    """
+
+    def __init__(self, threshold=NEAR_DUPLICATE_THRESHOLD):
+        self.threshold = threshold
+        self._pages = []  # (url, shingles)
+
+    def find_duplicate(self, shingles):
+        """
+        Return (url, similarity) of the most similar accepted page above the threshold, or None
+        shingles comes from content_shingles
+        """
+        best = None
+        for url, accepted in self._pages:
+            union = len(shingles | accepted)
+            similarity = len(shingles & accepted) / union if union else 1.0
+            if similarity >= self.threshold and (best is None or similarity > best[1]):
+                best = (url, similarity)
+        return best
+
+    def add(self, url, shingles):
+        self._pages.append((url, shingles))
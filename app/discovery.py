@@ -0,0 +1,179 @@
+import os
+import time
+import zlib
+import asyncio
+import threading
+import xml.etree.ElementTree as ET
+from urllib.parse import urljoin, urlparse
+from urllib.robotparser import RobotFileParser
+from collections import OrderedDict
+
+from app.http_pool import http_pool, ResponseTooLargeError
+from app.logger import setup_logger
+
+# Initialize logger
+logger = setup_logger('discovery')
+
+# Constants
+DISCOVERY_CACHE_TTL = int(os.getenv("DISCOVERY_CACHE_TTL", str(60 * 60)))  # Seconds robots/sitemap data is reused per domain
+DISCOVERY_CACHE_DOMAINS = int(os.getenv("DISCOVERY_CACHE_DOMAINS", "256"))  # Least recently used domains beyond this are dropped
+DISCOVERY_TIMEOUT = 8  # Seconds allowed for the whole discovery stage
+MAX_CRAWL_DELAY = 10  # Seconds; larger robots.txt crawl-delays are capped
+MAX_SITEMAPS = 6  # Sitemap documents fetched per domain, including indexes
+MAX_SITEMAP_URLS = 5000  # URLs kept per domain
+MAX_SITEMAP_BYTES = 10 * 1024 * 1024  # Applies to the decoded download and, for gzipped sitemaps, the decompressed size
+GZIP_CHUNK_BYTES = 64 * 1024
+DEFAULT_SITEMAP_PATHS = ['/sitemap.xml', '/sitemap_index.xml']
+ROBOTS_USER_AGENT = '*'
+
+_site_cache = OrderedDict()  # domain -> site data, least recently used first
+_site_cache_lock = threading.Lock()
+
+
+def _domain_key(url):
+    domain = urlparse(url).netloc.lower()
+    if domain.startswith('www.'):
+        domain = domain[4:]
+    return domain
+
+
+def _local_name(tag):
+    return tag.rsplit('}', 1)[-1].lower()
+
+
+def gunzip_limited(body, max_bytes=MAX_SITEMAP_BYTES):
+    """
+    Decompress a gzip body incrementally, refusing output larger than max_bytes (gzip bombs)
+    """
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    output = bytearray()
+    data = body
+    while data:
+        output += decompressor.decompress(data, max_bytes + 1 - len(output))
+        if len(output) > max_bytes:
+            raise ValueError(f"Decompressed sitemap exceeds {max_bytes} bytes")
+        data = decompressor.unconsumed_tail
+    return bytes(output)
+
+
+def parse_sitemap(body):
+    """
+    Parse a sitemap or sitemap index document
+    Returns (child_sitemaps, page_urls)
+    """
+    if body[:2] == b'\x1f\x8b':
+        body = gunzip_limited(body)
+    root = ET.fromstring(body)
+    locs = [
+        element.text.strip()
+        for element in root.iter()
+        if _local_name(element.tag) == 'loc' and element.text and element.text.strip()
+    ]
+    if _local_name(root.tag) == 'sitemapindex':
+        return locs, []
+    return [], locs
+
+
+async def _fetch_bytes(url):
+    try:
+        response, body = await http_pool.get_limited(url, MAX_SITEMAP_BYTES)
+        if response.status_code != 200:
+            logger.debug(f"Discovery fetch of {url} returned {response.status_code}")
+            return None
+        return body
+    except ResponseTooLargeError:
+        logger.warning(f"Ignoring oversized discovery document {url}")
+        return None
+    except Exception as e:
+        logger.debug(f"Discovery fetch of {url} failed: {str(e)}")
+        return None
+
+
+async def _discover(url):
+    parsed = urlparse(url)
+    origin = f"{parsed.scheme}://{parsed.netloc}"
+    robots = RobotFileParser()
+    robots.set_url(urljoin(origin, '/robots.txt'))
+    crawl_delay = None
+    sitemap_queue = []
+
+    robots_body = await _fetch_bytes(urljoin(origin, '/robots.txt'))
+    if robots_body:
+        robots.parse(robots_body.decode('utf-8', errors='replace').splitlines())
+        delay = robots.crawl_delay(ROBOTS_USER_AGENT)
+        if delay:
+            crawl_delay = min(float(delay), MAX_CRAWL_DELAY)
+        sitemap_queue.extend(robots.site_maps() or [])
+    if not sitemap_queue:
+        sitemap_queue = [urljoin(origin, path) for path in DEFAULT_SITEMAP_PATHS]
+
+    page_urls = []
+    fetched = set()
+    while sitemap_queue and len(fetched) < MAX_SITEMAPS and len(page_urls) < MAX_SITEMAP_URLS:
+        sitemap_url = sitemap_queue.pop(0)
+        if sitemap_url in fetched:
+            continue
+        fetched.add(sitemap_url)
+        body = await _fetch_bytes(sitemap_url)
+        if not body:
+            continue
+        try:
+            children, urls = parse_sitemap(body)
+        except (ET.ParseError, ValueError, zlib.error) as e:
+            logger.debug(f"Could not parse sitemap {sitemap_url}: {str(e)}")
+            continue
+        sitemap_queue.extend(children)
+        page_urls.extend(urls)
+
+    logger.info(
+        f"Discovered {len(page_urls)} sitemap URLs for {parsed.netloc} "
+        f"from {len(fetched)} sitemaps, crawl-delay: {crawl_delay}"
+    )
+    return {
+        "crawl_delay": crawl_delay,
+        "urls": list(dict.fromkeys(page_urls))[:MAX_SITEMAP_URLS],
+        "fetched_at": time.time(),
+    }
+
+
+def _prune_site_cache():
+    # Called with the lock held: drop expired domains, then the least recently used beyond the cap
+    expired_before = time.time() - DISCOVERY_CACHE_TTL
+    for key in [key for key, site in _site_cache.items() if site["fetched_at"] <= expired_before]:
+        del _site_cache[key]
+    while len(_site_cache) > DISCOVERY_CACHE_DOMAINS:
+        _site_cache.popitem(last=False)
+
+
+async def discover_site(url):
+    """
+    Return robots.txt and sitemap data for the URL's domain, fetched at most once per TTL
+    Result: dict(crawl_delay, urls, fetched_at); empty data if discovery fails or times out
+    """
+    key = _domain_key(url)
+    with _site_cache_lock:
+        cached = _site_cache.get(key)
+        if cached and cached["fetched_at"] + DISCOVERY_CACHE_TTL > time.time():
+            _site_cache.move_to_end(key)
+            logger.debug(f"Using cached discovery data for {key}")
+            return cached
+
+    try:
+        site = await asyncio.wait_for(_discover(url), timeout=DISCOVERY_TIMEOUT)
+    except Exception as e:
+        logger.warning(f"Discovery failed for {key}: {str(e)}")
+        site = {"crawl_delay": None, "urls": [], "fetched_at": time.time()}
+
+    with _site_cache_lock:
+        _site_cache[key] = site
+        _site_cache.move_to_end(key)
+        _prune_site_cache()
+    return site
+
+
+def get_discovery_stats():
+    with _site_cache_lock:
+        return {
+            "domains": len(_site_cache),
+            "urls": sum(len(site["urls"]) for site in _site_cache.values()),
+        }
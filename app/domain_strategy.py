@@ -0,0 +1,182 @@
+import os
+import time
+import sqlite3
+import threading
+from urllib.parse import urlparse
+
+from app.logger import setup_logger
+
+# Initialize logger
+logger = setup_logger('domain_strategy')
+
+# Constants
+DOMAIN_STRATEGY_PATH = os.getenv("DOMAIN_STRATEGY_PATH", os.path.join('cache', 'domain_strategies.sqlite3'))
+DOMAIN_STRATEGY_PRUNE_INTERVAL = int(os.getenv("DOMAIN_STRATEGY_PRUNE_INTERVAL", str(10 * 60)))  # Seconds between expiry prunes
+STRATEGY_STATIC = 'static'
+STRATEGY_RENDER = 'render'
+STRATEGY_BLOCKED = 'blocked'
+STRATEGY_TTLS = {
+    STRATEGY_STATIC: int(os.getenv("STATIC_STRATEGY_TTL", str(7 * 24 * 60 * 60))),
+    STRATEGY_RENDER: int(os.getenv("RENDER_STRATEGY_TTL", str(3 * 24 * 60 * 60))),
+    # Bot walls come and go, so retry blocked domains much sooner
+    STRATEGY_BLOCKED: int(os.getenv("BLOCKED_STRATEGY_TTL", str(30 * 60))),
+}
+
+
+def _domain_key(url):
+    domain = (urlparse(url).netloc or url).lower()
+    if domain.startswith('www.'):
+        domain = domain[4:]
+    return domain
+
+
+class DomainStrategyStore:
+    """
+    Remembers per domain whether pages come back usable from a plain fetch, need
+    JavaScript rendering, or hit a bot wall, so later pages and later tasks can go
+    straight to the right fetcher or fail fast.
+
+    One row per domain in a SQLite table shared by every worker process, so a verdict
+    reached by one worker is seen by all of them. Each update is a read-modify-write
+    inside one write transaction; expired rows are deleted at most once per prune
+    interval.
+    """
+
+    def __init__(self, path=DOMAIN_STRATEGY_PATH, prune_interval=DOMAIN_STRATEGY_PRUNE_INTERVAL):
+        self.path = path
+        self.prune_interval = prune_interval
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._last_prune = 0
+        self._stats = {"lookups": 0, "render_shortcuts": 0, "blocked_shortcuts": 0, "updates": 0, "expired": 0, "errors": 0}
+
+    def _connection(self):
+        # One connection per thread; sqlite3 connections must not be shared without locking
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS domain_strategies ("
+                "domain TEXT PRIMARY KEY, strategy TEXT NOT NULL, static INTEGER NOT NULL, "
+                "render INTEGER NOT NULL, expires_at REAL NOT NULL)"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS domain_strategies_expires ON domain_strategies (expires_at)")
+            self._local.connection = connection
+        return connection
+
+    def _increment(self, key, amount=1):
+        with self._lock:
+            self._stats[key] += amount
+
+    def _prune(self, connection, now):
+        with self._lock:
+            if now - self._last_prune < self.prune_interval:
+                return
+            self._last_prune = now
+        expired = connection.execute("DELETE FROM domain_strategies WHERE expires_at <= ?", (now,)).rowcount
+        self._increment("expired", expired)
+        if expired:
+            logger.debug(f"Pruned {expired} expired domain strategies")
+
+    def _live_row(self, connection, key, now):
+        return connection.execute(
+            "SELECT strategy, static, render, expires_at FROM domain_strategies WHERE domain = ? AND expires_at > ?",
+            (key, now)
+        ).fetchone()
+
+    def get(self, url):
+        """
+        Return the remembered strategy for the URL's domain, or None if unknown or expired
+        """
+        self._increment("lookups")
+        try:
+            row = self._live_row(self._connection(), _domain_key(url), time.time())
+        except sqlite3.Error as e:
+            self._increment("errors")
+            logger.warning(f"Failed to read domain strategy: {str(e)}")
+            return None
+        if row is None:
+            return None
+        strategy = row[0]
+        if strategy == STRATEGY_RENDER:
+            self._increment("render_shortcuts")
+        elif strategy == STRATEGY_BLOCKED:
+            self._increment("blocked_shortcuts")
+        return strategy
+
+    def record(self, url, outcome):
+        """
+        Record how a page of the URL's domain was obtained: static, render or blocked
+        The domain strategy follows the majority of static/render outcomes; a block wins outright.
+        """
+        key = _domain_key(url)
+        now = time.time()
+        try:
+            connection = self._connection()
+            # IMMEDIATE takes the write lock up front so concurrent workers cannot lose each other's counts
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._live_row(connection, key, now)
+                previous, static, render = (row[0], row[1], row[2]) if row else (None, 0, 0)
+                if outcome == STRATEGY_BLOCKED:
+                    strategy = STRATEGY_BLOCKED
+                else:
+                    if outcome == STRATEGY_RENDER:
+                        render += 1
+                    else:
+                        static += 1
+                    strategy = STRATEGY_RENDER if render > static else STRATEGY_STATIC
+                connection.execute(
+                    "INSERT OR REPLACE INTO domain_strategies VALUES (?, ?, ?, ?, ?)",
+                    (key, strategy, static, render, now + STRATEGY_TTLS[strategy])
+                )
+                connection.execute("COMMIT")
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+            self._prune(connection, now)
+        except sqlite3.Error as e:
+            self._increment("errors")
+            logger.warning(f"Failed to persist domain strategy for {key}: {str(e)}")
+            return
+        self._increment("updates")
+        if strategy != previous:
+            logger.info(f"Domain {key} now uses the {strategy} strategy")
+
+    def retry_after(self, url):
+        """
+        Seconds until the remembered strategy for the URL's domain expires
+        """
+        now = time.time()
+        try:
+            row = self._live_row(self._connection(), _domain_key(url), now)
+        except sqlite3.Error as e:
+            self._increment("errors")
+            logger.warning(f"Failed to read domain strategy: {str(e)}")
+            return 0
+        return max(int(row[3] - now), 0) if row else 0
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        for strategy in STRATEGY_TTLS:
+            stats[f"{strategy}_domains"] = 0
+        try:
+            for strategy, count in self._connection().execute(
+                "SELECT strategy, COUNT(*) FROM domain_strategies WHERE expires_at > ? GROUP BY strategy",
+                (time.time(),)
+            ):
+                stats[f"{strategy}_domains"] = count
+        except sqlite3.Error as e:
+            logger.error(f"Failed to read domain strategy counts: {str(e)}")
+        return stats
+
+
+domain_strategy = DomainStrategyStore()
+
+
+def get_domain_strategy_stats():
+    return domain_strategy.stats()
@@ -0,0 +1,241 @@
+import os
+import re
+
+from app.logger import setup_logger
+
+# Initialize logger
+logger = setup_logger('extraction')
+
+# Constants
+EXTRACTION_BACKEND = os.getenv("EXTRACTION_BACKEND", "auto")  # auto, selectolax, lxml or bs4
+CONTENT_TAGS = {'h1', 'h2', 'h3', 'p', 'li', 'span'}
+LIST_TAGS = {'ul', 'ol'}
+NON_VISIBLE_TAGS = ['script', 'style', 'template']
+MIN_CONTENT_ELEMENTS = 3
+BLOCK_PAGE_STRONG_PATTERNS = [
+    'vercel security checkpoint',
+    'enable javascript to continue',
+    'verify you are human',
+    'verify your browser',
+    'checking your browser',
+    'cf-browser-verification',
+    'challenge-platform',
+    'why have i been blocked',
+    'attention required!',
+]
+BLOCK_PAGE_MODERATE_PATTERNS = [
+    'security checkpoint',
+    'browser verification',
+    'browser check',
+    'access denied',
+    'request blocked',
+    'captcha',
+    'cloudflare',
+    'datadome',
+    'perimeterx',
+    'akamai',
+    'bot check',
+    'ddos protection',
+]
+
+
+def is_access_block_page(title='', description='', content=''):
+    """
+    Detect common anti-bot, CAPTCHA, and security interstitial pages.
+    """
+    normalized_text = ' '.join(filter(None, [title, description, content])).lower()
+    normalized_text = re.sub(r'\s+', ' ', normalized_text).strip()
+
+    if not normalized_text:
+        return False
+
+    if any(pattern in normalized_text for pattern in BLOCK_PAGE_STRONG_PATTERNS):
+        return True
+
+    moderate_match_count = sum(
+        1 for pattern in BLOCK_PAGE_MODERATE_PATTERNS
+        if pattern in normalized_text
+    )
+    if moderate_match_count >= 2:
+        return True
+
+    content_lines = [line.strip().lower() for line in content.splitlines() if line.strip()]
+    if (
+        len(content_lines) <= 10
+        and any('javascript' in line for line in content_lines)
+        and any(
+            keyword in line
+            for line in content_lines
+            for keyword in ['security', 'checkpoint', 'browser', 'verification']
+        )
+    ):
+        return True
+
+    return False
+
+
+def _new_page():
+    return {
+        "title": None,
+        "description": "",
+        "lines": [],
+        "links": [],
+        "content_elements": 0,
+        "root_empty": False,
+        "visible_text": "",
+    }
+
+
+def _has_content_ancestor_selectolax(node):
+    parent = node.parent
+    while parent is not None:
+        if parent.tag in CONTENT_TAGS:
+            return True
+        parent = parent.parent
+    return False
+
+
+def _extract_selectolax(html):
+    from selectolax.parser import HTMLParser
+
+    tree = HTMLParser(html)
+    tree.strip_tags(NON_VISIBLE_TAGS)
+    page = _new_page()
+    if tree.root is None:
+        return page
+    for node in tree.root.traverse(include_text=False):
+        tag = node.tag
+        if tag in CONTENT_TAGS:
+            page["content_elements"] += 1
+            text = node.text(deep=True, separator='', strip=True)
+            if text and not _has_content_ancestor_selectolax(node):
+                page["lines"].append(f"{tag.upper()}: {text}")
+        elif tag in LIST_TAGS:
+            page["content_elements"] += 1
+        if tag == 'a':
+            href = node.attributes.get('href')
+            if href:
+                page["links"].append((href, node.text(deep=True, separator=' ', strip=True)))
+        elif tag == 'title' and page["title"] is None:
+            page["title"] = node.text(deep=True, separator='', strip=False)
+        elif tag == 'meta' and not page["description"] and node.attributes.get('name') == 'description':
+            page["description"] = node.attributes.get('content') or ""
+        elif tag == 'div' and node.attributes.get('id') == 'root' and not page["root_empty"]:
+            page["root_empty"] = not node.text(deep=True, strip=True)
+    page["visible_text"] = tree.root.text(deep=True, separator=' ', strip=True)
+    return page
+
+
+def _extract_lxml(html):
+    import lxml.html
+    from lxml import etree
+
+    if not html or not html.strip():
+        return _new_page()
+    parser = lxml.html.HTMLParser(encoding='utf-8')
+    try:
+        root = lxml.html.document_fromstring(html.encode('utf-8'), parser=parser)
+    except etree.ParserError as e:
+        # Nothing parseable (e.g. only a comment); an untitled page is insufficient, so it gets rendered
+        logger.debug(f"lxml could not parse page: {str(e)}")
+        return _new_page()
+    etree.strip_elements(root, *NON_VISIBLE_TAGS, with_tail=False)
+    page = _new_page()
+    for element in root.iter():
+        tag = element.tag
+        if not isinstance(tag, str):
+            continue  # Comments and processing instructions
+        if tag in CONTENT_TAGS:
+            page["content_elements"] += 1
+            text = ''.join(part.strip() for part in element.itertext())
+            if text and not any(ancestor.tag in CONTENT_TAGS for ancestor in element.iterancestors()):
+                page["lines"].append(f"{tag.upper()}: {text}")
+        elif tag in LIST_TAGS:
+            page["content_elements"] += 1
+        if tag == 'a':
+            href = element.get('href')
+            if href:
+                page["links"].append((href, ' '.join(part.strip() for part in element.itertext() if part.strip())))
+        elif tag == 'title' and page["title"] is None:
+            page["title"] = element.text or ""
+        elif tag == 'meta' and not page["description"] and element.get('name') == 'description':
+            page["description"] = element.get('content') or ""
+        elif tag == 'div' and element.get('id') == 'root' and not page["root_empty"]:
+            page["root_empty"] = not ''.join(element.itertext()).strip()
+    page["visible_text"] = ' '.join(part.strip() for part in root.itertext() if part.strip())
+    return page
+
+
+def _extract_bs4(html):
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, 'html.parser')
+    for element in soup.find_all(NON_VISIBLE_TAGS):
+        element.decompose()
+    page = _new_page()
+    tags = list(CONTENT_TAGS | LIST_TAGS | {'a', 'title', 'meta', 'div'})
+    for element in soup.find_all(tags):
+        tag = element.name
+        if tag in CONTENT_TAGS:
+            page["content_elements"] += 1
+            text = element.get_text(strip=True)
+            if text and element.find_parent(list(CONTENT_TAGS)) is None:
+                page["lines"].append(f"{tag.upper()}: {text}")
+        elif tag in LIST_TAGS:
+            page["content_elements"] += 1
+        if tag == 'a':
+            if element.get('href'):
+                page["links"].append((element['href'], element.get_text(" ", strip=True)))
+        elif tag == 'title' and page["title"] is None:
+            page["title"] = element.string or ""
+        elif tag == 'meta' and not page["description"] and element.get('name') == 'description':
+            page["description"] = element.get('content') or ""
+        elif tag == 'div' and element.get('id') == 'root' and not page["root_empty"]:
+            page["root_empty"] = not element.get_text(strip=True)
+    page["visible_text"] = soup.get_text(" ", strip=True)
+    return page
+
+
+BACKENDS = {
+    "selectolax": _extract_selectolax,
+    "lxml": _extract_lxml,
+    "bs4": _extract_bs4,
+}
+
+
+def _resolve_backend(name):
+    if name != "auto":
+        return name
+    for candidate, module in [("selectolax", "selectolax.parser"), ("lxml", "lxml.html")]:
+        try:
+            __import__(module)
+            return candidate
+        except ImportError:
+            continue
+    return "bs4"
+
+
+_backend_name = _resolve_backend(EXTRACTION_BACKEND)
+logger.debug(f"Using {_backend_name} extraction backend")
+
+
+def extract_page(html, backend=None):
+    """
+    Parse HTML once and return everything the scraper needs from it:
+    title, description, structured content lines (text nested in an already
+    emitted element such as a span inside a p is not repeated), (href, anchor text) links,
+    the block-page verdict on the visible text and whether the content looks
+    sufficient or needs JavaScript rendering.
+    """
+    page = BACKENDS[backend or _backend_name](html)
+    has_title = page["title"] is not None
+    page["title"] = (page["title"] or "").strip()
+    page["blocked"] = is_access_block_page(page["title"], page["description"], page["visible_text"])
+    page["sufficient"] = (
+        has_title
+        and not page["blocked"]
+        and page["content_elements"] >= MIN_CONTENT_ELEMENTS
+        and not page["root_empty"]
+    )
+    del page["visible_text"]
+    return page
@@ -0,0 +1,289 @@
+import os
+import asyncio
+import itertools
+import socket
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlparse
+
+import httpx
+from fake_useragent import UserAgent
+
+from app.logger import setup_logger
+from app.job_queue import STAGE_CAPACITY
+
+# Initialize logger
+logger = setup_logger('http_pool')
+
+# Constants
+HTTP_POOL_MAX_CONNECTIONS_PER_HOST = int(os.getenv("HTTP_POOL_MAX_CONNECTIONS_PER_HOST", "6"))
+HTTP_POOL_MAX_HOSTS = int(os.getenv("HTTP_POOL_MAX_HOSTS", "64"))  # Least recently used host sessions beyond this are closed
+HTTP_POOL_KEEPALIVE_EXPIRY = 60  # Seconds an idle connection is kept open
+HTTP_REQUEST_TIMEOUT = 10  # Default seconds per request
+HEADER_PROFILE_COUNT = 20  # Number of precomputed header profiles to rotate through
+# Opt-in: the cache replaces socket.getaddrinfo for the whole process (LLM and translation
+# clients included) and holds answers for this fixed TTL regardless of the records' own TTLs
+DNS_CACHE_TTL = int(os.getenv("DNS_CACHE_TTL", "0"))  # Seconds, 0 (the default) leaves DNS resolution alone
+DNS_CACHE_MAX_ENTRIES = 1024
+FALLBACK_USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+
+try:
+    import brotli  # noqa: F401
+    ACCEPT_ENCODING = 'gzip, deflate, br'
+except ImportError:
+    # httpx can only decode brotli bodies when the brotli package is installed
+    ACCEPT_ENCODING = 'gzip, deflate'
+
+
+class ResponseTooLargeError(Exception):
+    """
+    Raised when a size-limited response body exceeds its limit
+    """
+    pass
+
+
+_original_getaddrinfo = socket.getaddrinfo
+_dns_cache = OrderedDict()
+_dns_lock = threading.Lock()
+_dns_stats = {"hits": 0, "misses": 0}
+
+
+def _cached_getaddrinfo(host, port, family=0, type=0, proto=0, flags=0):
+    """
+    socket.getaddrinfo with a process-wide TTL cache
+    """
+    key = (host, port, family, type, proto, flags)
+    now = time.monotonic()
+    with _dns_lock:
+        entry = _dns_cache.get(key)
+        if entry and entry[0] > now:
+            _dns_cache.move_to_end(key)
+            _dns_stats["hits"] += 1
+            return entry[1]
+    result = _original_getaddrinfo(host, port, family, type, proto, flags)
+    with _dns_lock:
+        _dns_stats["misses"] += 1
+        _dns_cache[key] = (now + DNS_CACHE_TTL, result)
+        while len(_dns_cache) > DNS_CACHE_MAX_ENTRIES:
+            _dns_cache.popitem(last=False)
+    return result
+
+
+def install_dns_cache():
+    """
+    Route name resolution through the DNS cache when DNS_CACHE_TTL is set
+    The async HTTP stack resolves via socket.getaddrinfo, so this affects every library in the process.
+    """
+    if DNS_CACHE_TTL > 0 and socket.getaddrinfo is not _cached_getaddrinfo:
+        socket.getaddrinfo = _cached_getaddrinfo
+        logger.info(f"Process-wide DNS cache installed with TTL {DNS_CACHE_TTL}s")
+
+
+def _build_header_profiles(count):
+    """
+    Build a fixed set of browser-like header profiles from a single UserAgent dataset load
+    """
+    try:
+        ua = UserAgent()
+        user_agents = [ua.random for _ in range(count)]
+    except Exception as e:
+        logger.warning(f"Failed to load user agents, using fallback: {str(e)}")
+        user_agents = [FALLBACK_USER_AGENT]
+
+    profiles = []
+    for user_agent in dict.fromkeys(user_agents):
+        profiles.append({
+            'User-Agent': user_agent,
+            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+            'Accept-Language': 'en-US,en;q=0.5',
+            'Accept-Encoding': ACCEPT_ENCODING,
+            'DNT': '1',
+            'Connection': 'keep-alive',
+            'Upgrade-Insecure-Requests': '1',
+            'Cache-Control': 'max-age=0',
+        })
+    return profiles
+
+
+_header_profiles = None
+_header_cycle = None
+_header_lock = threading.Lock()
+
+
+def get_header_profile():
+    """
+    Return the next header profile from the precomputed rotation
+    """
+    global _header_profiles, _header_cycle
+    with _header_lock:
+        if _header_cycle is None:
+            _header_profiles = _build_header_profiles(HEADER_PROFILE_COUNT)
+            _header_cycle = itertools.cycle(_header_profiles)
+            logger.debug(f"Built {len(_header_profiles)} header profiles")
+        return dict(next(_header_cycle))
+
+
+class HttpPool:
+    """
+    Process-wide pool of keep-alive HTTP sessions, one per host.
+
+    All sessions live on a dedicated event loop thread so that any caller, from any
+    thread or event loop, shares the same warm connections.
+    """
+
+    def __init__(
+        self,
+        max_connections_per_host=HTTP_POOL_MAX_CONNECTIONS_PER_HOST,
+        max_hosts=HTTP_POOL_MAX_HOSTS,
+        keepalive_expiry=HTTP_POOL_KEEPALIVE_EXPIRY,
+        max_in_flight=STAGE_CAPACITY["fetch"],
+    ):
+        self.max_connections_per_host = max_connections_per_host
+        self.max_in_flight = max_in_flight
+        self.max_hosts = max_hosts
+        self.keepalive_expiry = keepalive_expiry
+        self._lock = threading.Lock()
+        self._loop = None
+        self._clients = OrderedDict()  # Only touched from the pool loop
+        self._in_flight = None  # Semaphore created on the pool loop
+        self._stats = {"requests": 0, "errors": 0, "new_connections": 0, "hosts_evicted": 0}
+        self._host_stats = {}  # Hosts with an open session only
+
+    def _ensure_loop(self):
+        with self._lock:
+            if self._loop is None:
+                install_dns_cache()
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name='http-pool', daemon=True).start()
+                self._loop = loop
+            return self._loop
+
+    def _client_for(self, host):
+        client = self._clients.get(host)
+        if client is not None:
+            self._clients.move_to_end(host)
+            return client
+
+        client = httpx.AsyncClient(
+            follow_redirects=True,
+            timeout=HTTP_REQUEST_TIMEOUT,
+            limits=httpx.Limits(
+                max_connections=self.max_connections_per_host,
+                max_keepalive_connections=self.max_connections_per_host,
+                keepalive_expiry=self.keepalive_expiry,
+            ),
+        )
+        self._clients[host] = client
+        while len(self._clients) > self.max_hosts:
+            evicted_host, evicted_client = self._clients.popitem(last=False)
+            asyncio.ensure_future(evicted_client.aclose())
+            with self._lock:
+                self._stats["hosts_evicted"] += 1
+                self._host_stats.pop(evicted_host, None)
+            logger.debug(f"Closed idle HTTP session for {evicted_host}")
+        return client
+
+    async def _request(self, method, url, headers, timeout, max_bytes=None):
+        # Caps fetches across every concurrent crawl, not just within one
+        if self._in_flight is None:
+            self._in_flight = asyncio.Semaphore(self.max_in_flight)
+        async with self._in_flight:
+            return await self._send(method, url, headers, timeout, max_bytes)
+
+    async def _read_limited(self, client, request, max_bytes):
+        # Counts the decoded bytes, so a compressed transfer cannot expand past max_bytes either
+        response = await client.send(request, stream=True)
+        try:
+            body = bytearray()
+            async for chunk in response.aiter_bytes():
+                body += chunk
+                if len(body) > max_bytes:
+                    raise ResponseTooLargeError(f"Response body of {request.url} exceeds {max_bytes} bytes")
+            return response, bytes(body)
+        finally:
+            await response.aclose()
+
+    async def _send(self, method, url, headers, timeout, max_bytes=None):
+        host = urlparse(url).netloc.lower()
+        client = self._client_for(host)
+        new_connections = 0
+
+        async def trace(event_name, info):
+            nonlocal new_connections
+            if event_name == 'connection.connect_tcp.complete':
+                new_connections += 1
+
+        try:
+            request = client.build_request(
+                method,
+                url,
+                headers=headers,
+                timeout=timeout,
+                extensions={'trace': trace},
+            )
+            if max_bytes is not None:
+                return await self._read_limited(client, request, max_bytes)
+            return await client.send(request)
+        except Exception:
+            with self._lock:
+                self._stats["errors"] += 1
+            raise
+        finally:
+            with self._lock:
+                self._stats["requests"] += 1
+                self._stats["new_connections"] += new_connections
+                # Per-host figures cover the open sessions only, so they stay bounded by max_hosts
+                if host in self._clients:
+                    host_stats = self._host_stats.setdefault(host, {"requests": 0, "new_connections": 0})
+                    host_stats["requests"] += 1
+                    host_stats["new_connections"] += new_connections
+
+    async def request(self, method, url, headers=None, timeout=HTTP_REQUEST_TIMEOUT):
+        """
+        Send a request through the shared pool; awaitable from any event loop
+        """
+        loop = self._ensure_loop()
+        future = asyncio.run_coroutine_threadsafe(
+            self._request(method, url, headers or get_header_profile(), timeout),
+            loop
+        )
+        return await asyncio.wrap_future(future)
+
+    async def get(self, url, headers=None, timeout=HTTP_REQUEST_TIMEOUT):
+        return await self.request('GET', url, headers=headers, timeout=timeout)
+
+    async def get_limited(self, url, max_bytes, headers=None, timeout=HTTP_REQUEST_TIMEOUT):
+        """
+        GET that streams the body and stops once it decodes to more than max_bytes
+        Returns (response, body); raises ResponseTooLargeError for an oversized body
+        """
+        loop = self._ensure_loop()
+        future = asyncio.run_coroutine_threadsafe(
+            self._request('GET', url, headers or get_header_profile(), timeout, max_bytes),
+            loop
+        )
+        return await asyncio.wrap_future(future)
+
+    def stats(self):
+        """
+        Snapshot of pool usage; reused_connections counts requests served without a new TCP connect
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats["reused_connections"] = max(stats["requests"] - stats["new_connections"], 0)
+            stats["open_host_sessions"] = len(self._clients)
+            stats["max_in_flight"] = self.max_in_flight
+            stats["hosts"] = {host: dict(values) for host, values in self._host_stats.items()}
+        with _dns_lock:
+            stats["dns_cache"] = dict(_dns_stats, entries=len(_dns_cache))
+        with _header_lock:
+            stats["header_profiles"] = len(_header_profiles or [])
+        return stats
+
+
+http_pool = HttpPool()
+
+
+def get_pool_stats():
+    return http_pool.stats()
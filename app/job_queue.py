@@ -0,0 +1,193 @@
+import os
+import math
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager
+
+from app.logger import setup_logger
+from app.status_store import set_status
+
+# Initialize logger
+logger = setup_logger('job_queue')
+
+# Constants
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))  # Analyses running at once
+JOB_QUEUE_SIZE = int(os.getenv("JOB_QUEUE_SIZE", "32"))  # Analyses waiting beyond that before requests are rejected
+DEFAULT_JOB_SECONDS = 60  # Assumed job duration until real durations are known
+# Per-stage caps shared by all jobs. Render capacity is the browser pool size
+# (RENDER_POOL_BROWSERS x RENDER_POOL_TABS_PER_BROWSER).
+STAGE_CAPACITY = {
+    "fetch": int(os.getenv("FETCH_CAPACITY", "16")),  # Outbound page requests, enforced by the HTTP pool
+    "llm": int(os.getenv("LLM_CAPACITY", "6")),  # Completion requests in flight
+}
+
+
+class QueueFullError(Exception):
+    """
+    Raised when the job queue cannot take another job
+    """
+
+    def __init__(self, retry_after):
+        super().__init__(f"Job queue is full, retry in {retry_after} seconds")
+        self.retry_after = retry_after
+
+
+class StageLimiter:
+    """
+    Process-wide caps on thread-based pipeline stages, shared by all running jobs
+    """
+
+    def __init__(self, capacities):
+        self.capacities = dict(capacities)
+        self._semaphores = {name: threading.BoundedSemaphore(value) for name, value in capacities.items()}
+        self._lock = threading.Lock()
+        self._active = {name: 0 for name in capacities}
+        self._waiting = {name: 0 for name in capacities}
+
+    @contextmanager
+    def slot(self, stage):
+        semaphore = self._semaphores[stage]
+        with self._lock:
+            self._waiting[stage] += 1
+        semaphore.acquire()
+        with self._lock:
+            self._waiting[stage] -= 1
+            self._active[stage] += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._active[stage] -= 1
+            semaphore.release()
+
+    def stats(self):
+        with self._lock:
+            return {
+                name: {"capacity": capacity, "active": self._active[name], "waiting": self._waiting[name]}
+                for name, capacity in self.capacities.items()
+            }
+
+
+class _Job:
+    def __init__(self, task_id, fn, args, kwargs):
+        self.task_id = task_id
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.enqueued_at = time.monotonic()
+
+
+class JobScheduler:
+    """
+    Fixed pool of worker threads fed from a bounded FIFO queue.
+
+    Waiting jobs have their queue position published in the status store so clients
+    can show it; when the queue is full, submit raises QueueFullError with an
+    estimate of when to retry.
+    """
+
+    def __init__(self, workers=JOB_WORKERS, max_queued=JOB_QUEUE_SIZE):
+        self.workers = workers
+        self.max_queued = max_queued
+        self._condition = threading.Condition()
+        self._queue = deque()
+        self._threads = []
+        self._running = 0
+        self._durations = deque(maxlen=50)
+        self._stats = {"submitted": 0, "rejected": 0, "completed": 0, "failed": 0, "total_wait_seconds": 0.0}
+
+    def _start_workers(self):
+        # Called with the condition held
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(
+                target=self._work,
+                name=f'job-worker-{len(self._threads)}',
+                daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def _average_duration(self):
+        if not self._durations:
+            return DEFAULT_JOB_SECONDS
+        return sum(self._durations) / len(self._durations)
+
+    def _retry_after(self):
+        # Time for the running jobs and the queue to drain through the workers
+        return max(math.ceil(self._average_duration() * (len(self._queue) + 1) / self.workers), 1)
+
+    def _publish_position(self, job, position):
+        set_status(job.task_id, {
+            "step": "queued",
+            "progress": 0,
+            "message": "Task queued" if position == 1 else f"Task queued, {position - 1} ahead",
+            "queue_position": position,
+            "estimated_wait_seconds": math.ceil(self._average_duration() * (position - 1) / self.workers),
+        })
+
+    def submit(self, task_id, fn, *args, **kwargs):
+        """
+        Queue fn(*args, **kwargs) for a worker; returns the queue position
+        Raises QueueFullError when max_queued jobs are already waiting
+        """
+        with self._condition:
+            if len(self._queue) >= self.max_queued:
+                self._stats["rejected"] += 1
+                raise QueueFullError(self._retry_after())
+            self._start_workers()
+            job = _Job(task_id, fn, args, kwargs)
+            self._queue.append(job)
+            self._stats["submitted"] += 1
+            position = len(self._queue)
+            # Published under the condition so it cannot overwrite a status set once the job starts
+            self._publish_position(job, position)
+            self._condition.notify()
+        logger.info(f"Queued task {task_id} at position {position}")
+        return position
+
+    def _work(self):
+        while True:
+            with self._condition:
+                while not self._queue:
+                    self._condition.wait()
+                job = self._queue.popleft()
+                self._running += 1
+                self._stats["total_wait_seconds"] += time.monotonic() - job.enqueued_at
+                for position, waiting_job in enumerate(self._queue, start=1):
+                    self._publish_position(waiting_job, position)
+
+            started = time.monotonic()
+            failed = False
+            try:
+                job.fn(*job.args, **job.kwargs)
+            except Exception as e:
+                failed = True
+                logger.error(f"Task {job.task_id} failed: {str(e)}")
+            finally:
+                with self._condition:
+                    self._running -= 1
+                    self._durations.append(time.monotonic() - started)
+                    self._stats["failed" if failed else "completed"] += 1
+
+    def stats(self):
+        with self._condition:
+            stats = dict(self._stats)
+            started = stats["submitted"] - len(self._queue)
+            stats["avg_wait_seconds"] = round(stats.pop("total_wait_seconds") / started, 3) if started else 0.0
+            stats["avg_job_seconds"] = round(self._average_duration(), 3)
+            stats["workers"] = self.workers
+            stats["running"] = self._running
+            stats["queued"] = len(self._queue)
+            stats["max_queued"] = self.max_queued
+        return stats
+
+
+job_scheduler = JobScheduler()
+stage_limiter = StageLimiter({"llm": STAGE_CAPACITY["llm"]})
+
+
+def get_job_queue_stats():
+    stats = job_scheduler.stats()
+    stats["stages"] = stage_limiter.stats()
+    return stats
@@ -0,0 +1,79 @@
+import re
+from langdetect import DetectorFactory, detect, LangDetectException
+
+from app.logger import setup_logger
+
+# Initialize logger
+logger = setup_logger('language_id')
+
+# langdetect is randomised; a fixed seed makes repeat runs agree
+DetectorFactory.seed = 0
+
+# Constants
+SAMPLE_CHARS = 3000  # Characters inspected, taken from the start, middle and end of the text
+KANA_PATTERN = re.compile(r'[\u3040-\u30ff\uff66-\uff9f]')
+HAN_PATTERN = re.compile(r'[\u3400-\u4dbf\u4e00-\u9fff]')
+HANGUL_PATTERN = re.compile(r'[\uac00-\ud7af\u1100-\u11ff]')
+LATIN_PATTERN = re.compile(r'[A-Za-z\u00c0-\u024f]')
+WORD_PATTERN = re.compile(r'[a-z]+')
+ENGLISH_FUNCTION_WORDS = {
+    'the', 'and', 'of', 'to', 'in', 'for', 'is', 'are', 'on', 'with', 'you', 'your',
+    'we', 'our', 'that', 'this', 'by', 'at', 'from', 'as', 'it', 'be', 'or', 'an',
+    'can', 'more', 'about', 'us', 'all', 'how', 'what', 'will', 'has', 'have',
+}
+MIN_LETTERS = 20  # Fewer letters than this is too little evidence for the fast path
+KANA_RATIO = 0.05  # Japanese prose is rarely below this share of kana among its letters
+SCRIPT_RATIO = 0.3  # Share of letters a non-Latin script needs to decide the language
+ENGLISH_WORD_RATIO = 0.15  # Share of words that are English function words in English prose
+
+
+def _sample(text):
+    if len(text) <= SAMPLE_CHARS:
+        return text
+    part = SAMPLE_CHARS // 3
+    middle = len(text) // 2
+    return ' '.join([text[:part], text[middle - part // 2:middle + part // 2], text[-part:]])
+
+
+def _classify_by_script(sample):
+    """
+    Decide the language from Unicode script ratios, or return None when ambiguous
+    """
+    kana = len(KANA_PATTERN.findall(sample))
+    han = len(HAN_PATTERN.findall(sample))
+    hangul = len(HANGUL_PATTERN.findall(sample))
+    latin = len(LATIN_PATTERN.findall(sample))
+    letters = kana + han + hangul + latin
+    if letters < MIN_LETTERS:
+        return None
+    if kana / letters >= KANA_RATIO and (kana + han) / letters >= SCRIPT_RATIO:
+        return 'ja'
+    if hangul / letters >= SCRIPT_RATIO:
+        return 'ko'
+    if latin / letters > 1 - SCRIPT_RATIO:
+        words = WORD_PATTERN.findall(sample.lower())
+        if words and sum(1 for word in words if word in ENGLISH_FUNCTION_WORDS) / len(words) >= ENGLISH_WORD_RATIO:
+            return 'en'
+    # Han without kana (Chinese or kanji-heavy Japanese) and non-English Latin text
+    return None
+
+
+def detect_language(text):
+    """
+    Identify the language of text, returning an ISO 639-1 code or None if it has no letters
+    Script ratios on a sample settle most pages; langdetect only sees ambiguous samples.
+    """
+    if not text or not text.strip():
+        return None
+    sample = _sample(text)
+    language = _classify_by_script(sample)
+    if language:
+        logger.debug(f"Detected language {language} from script ratios")
+        return language
+    try:
+        language = detect(sample)
+        logger.debug(f"Detected language {language} with langdetect")
+        return language
+    except LangDetectException:
+        # For numbers, short strings, etc.
+        return None
@@ -0,0 +1,146 @@
+import re
+import heapq
+from urllib.parse import urlparse
+
+# Keyword tables per analysis mode; weights are added when a keyword starts a word of
+# the URL path (full weight) or of the anchor text (ANCHOR_WEIGHT of it).
+BUSINESS_KEYWORDS = {
+    'pricing': 6, 'price': 6, 'plans': 5, 'cost': 4, 'subscription': 4, 'quote': 3,
+    'services': 5, 'service': 4, 'products': 5, 'product': 4, 'solutions': 4, 'features': 4,
+    'about': 5, 'company': 3, 'team': 2, 'mission': 3, 'story': 2,
+    'faq': 4, 'how it works': 3, 'customers': 3, 'case studies': 3, 'testimonials': 3,
+    'industries': 2, 'contact': 1,
+}
+UNIVERSITY_KEYWORDS = {
+    'about': 4, 'academics': 5, 'programs': 5, 'majors': 4, 'degrees': 4,
+    'admissions': 5, 'apply': 4, 'tuition': 4, 'financial aid': 4, 'student life': 3,
+    'campus life': 3, 'athletics': 2, 'faq': 3, 'visit': 2,
+}
+AGENT_KEYWORDS = {
+    "recruiter_ai": {
+        'admissions': 6, 'apply': 5, 'visit': 5, 'tour': 4, 'events': 4, 'programs': 5,
+        'majors': 5, 'international': 3, 'transfer': 3, 'why': 3, 'future students': 5,
+        'outcomes': 3, 'deadlines': 4,
+    },
+    "admissions_ai": {
+        'admissions': 7, 'admission': 7, 'apply': 6, 'application': 6, 'requirements': 6,
+        'deadlines': 5, 'deadline': 5, 'first year': 4, 'freshman': 4, 'transfer': 4,
+        'international': 4, 'test': 3, 'transcripts': 3, 'decision': 3, 'enroll': 3,
+    },
+    "financial_aid_ai": {
+        'financial aid': 8, 'aid': 5, 'scholarships': 7, 'scholarship': 7, 'grants': 5,
+        'tuition': 6, 'cost': 5, 'fees': 5, 'fafsa': 6, 'loans': 4, 'net price': 5,
+        'work study': 4, 'affordability': 4, 'billing': 3,
+    },
+    "athletics_ai": {
+        'athletics': 8, 'sports': 7, 'teams': 5, 'roster': 4, 'schedule': 4, 'recruiting': 5,
+        'recruit': 5, 'varsity': 5, 'intramural': 3, 'club sports': 3, 'facilities': 3,
+        'coaches': 4, 'ncaa': 4,
+    },
+    "campus_life_ai": {
+        'student life': 8, 'campus life': 8, 'housing': 6, 'residence': 5, 'dining': 5,
+        'clubs': 5, 'organizations': 5, 'activities': 4, 'events': 4, 'wellness': 4,
+        'health': 3, 'safety': 4, 'diversity': 3, 'traditions': 3,
+    },
+}
+NEGATIVE_PATTERNS = [
+    r'/(login|log-in|signin|sign-in|signup|sign-up|register|account|cart|checkout|basket)\b',
+    r'/(privacy|terms|cookie|legal|disclaimer|sitemap|accessibility)\b',
+    r'/(tag|tags|category|categories|author|feed|rss|search|archive|archives)\b',
+    r'/(page|p)/\d+',
+    r'/wp-(content|json|admin|includes)/',
+    r'/\d{4}/\d{2}/',  # Dated blog posts
+    r'\.(pdf|jpe?g|png|gif|svg|webp|zip|docx?|xlsx?|pptx?|mp4|mp3|ics|xml|json|css|js)$',
+]
+ANCHOR_WEIGHT = 0.6
+DEPTH_PENALTY = 1.0  # Per path segment beyond the first
+QUERY_PENALTY = 2.0
+NEGATIVE_PENALTY = 20.0
+
+_negative_regexes = [re.compile(pattern, re.IGNORECASE) for pattern in NEGATIVE_PATTERNS]
+
+
+def _word_text(text):
+    """
+    Lowercase words of text joined by single spaces, padded for word-start matching
+    """
+    return ' ' + ' '.join(word for word in re.split(r'[\W_]+', text.lower()) if word) + ' '
+
+
+def get_keyword_table(data_type='business', agent_type=None):
+    """
+    Keyword weights for an analysis mode; university agents extend the general university table
+    """
+    if data_type == 'university':
+        table = dict(UNIVERSITY_KEYWORDS)
+        for keyword, weight in AGENT_KEYWORDS.get(agent_type, {}).items():
+            table[keyword] = max(weight, table.get(keyword, 0))
+        return table
+    return dict(BUSINESS_KEYWORDS)
+
+
+class LinkScorer:
+    """
+    Deterministic relevance score for a candidate URL in a given analysis mode
+    """
+
+    def __init__(self, data_type='business', agent_type=None):
+        # Leading space anchors each keyword to the start of a word, so "price" also matches "prices"
+        self.keywords = [
+            (' ' + keyword, weight)
+            for keyword, weight in get_keyword_table(data_type, agent_type).items()
+        ]
+
+    def _keyword_score(self, text):
+        words = _word_text(text)
+        return sum(weight for keyword, weight in self.keywords if keyword in words)
+
+    def score(self, url, anchor_text=''):
+        parsed = urlparse(url)
+        path = parsed.path or '/'
+        if any(regex.search(path) for regex in _negative_regexes):
+            return -NEGATIVE_PENALTY
+
+        segments = [segment for segment in path.split('/') if segment]
+        score = self._keyword_score(' '.join(segments))
+        if anchor_text:
+            score += ANCHOR_WEIGHT * self._keyword_score(anchor_text)
+        score -= DEPTH_PENALTY * max(len(segments) - 1, 0)
+        if parsed.query:
+            score -= QUERY_PENALTY
+        return round(score, 3)
+
+
+class Frontier:
+    """
+    Priority queue of URLs to crawl; highest score first, ties broken by URL
+    key maps a URL to the identity used to skip URLs that were already queued
+    """
+
+    def __init__(self, scorer, key=None):
+        self.scorer = scorer
+        self.key = key or (lambda url: url)
+        self._heap = []
+        self._seen = set()
+
+    def __len__(self):
+        return len(self._heap)
+
+    def __contains__(self, url):
+        return self.key(url) in self._seen
+
+    def push(self, url, anchor_text='', score=None):
+        """
+        Queue url unless it was already queued; returns True when added
+        """
+        identity = self.key(url)
+        if identity in self._seen:
+            return False
+        self._seen.add(identity)
+        if score is None:
+            score = self.scorer.score(url, anchor_text)
+        heapq.heappush(self._heap, (-score, url))
+        return True
+
+    def pop_many(self, count):
+        return [heapq.heappop(self._heap)[1] for _ in range(min(count, len(self._heap)))]
@@ -0,0 +1,210 @@
+import os
+import threading
+
+import httpx
+from openai import OpenAI
+
+from app.logger import setup_logger
+from app.job_queue import STAGE_CAPACITY
+
+# Initialize logger
+logger = setup_logger('llm_client')
+
+# Constants
+LLM_BASE_URL = os.getenv("LLM_BASE_URL", "https://api.groq.com/openai/v1")
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "5"))  # Seconds to establish a connection
+LLM_READ_TIMEOUT = float(os.getenv("LLM_READ_TIMEOUT", "120"))  # Seconds between bytes of a completion
+LLM_WRITE_TIMEOUT = 30  # Seconds to send a request body
+LLM_POOL_TIMEOUT = 30  # Seconds to wait for a free connection
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))  # Retries by the SDK on connection errors, 429 and 5xx
+LLM_KEEPALIVE_EXPIRY = 120  # Seconds an idle connection is kept open
+LLM_PREWARM = os.getenv("LLM_PREWARM", "1") == "1"  # Open the first connection at startup, off the request path
+LLM_STREAMING = os.getenv("LLM_STREAMING", "1") == "1"  # Stream completions so fields can be published as they finish
+# Completions in flight are capped by the llm stage; one connection each (HTTP/2 multiplexes them anyway)
+LLM_POOL_CONNECTIONS = STAGE_CAPACITY["llm"]
+
+try:
+    import h2  # noqa: F401
+    LLM_HTTP2 = os.getenv("LLM_HTTP2", "1") == "1"
+except ImportError:
+    # httpx can only speak HTTP/2 when the h2 package is installed
+    LLM_HTTP2 = False
+
+
+def _field(value, name):
+    # Usage may be an SDK object or, for provider extensions, a plain dict
+    if isinstance(value, dict):
+        return value.get(name)
+    return getattr(value, name, None)
+
+
+def usage_counts(usage):
+    """
+    (prompt tokens, cached prompt tokens, completion tokens) from a completion's usage
+    """
+    if not usage:
+        return 0, 0, 0
+    cached = _field(_field(usage, 'prompt_tokens_details'), 'cached_tokens') or 0
+    return _field(usage, 'prompt_tokens') or 0, cached, _field(usage, 'completion_tokens') or 0
+
+
+class LLMClientManager:
+    """
+    Process-wide OpenAI-compatible client over one pooled keep-alive HTTP client.
+
+    Every analysis shares the same warm connections, so TLS handshakes are paid once
+    per connection instead of once per task. Timeouts are explicit rather than the
+    SDK defaults. Each completion's latency is recorded per model, along with the
+    time to first token of streamed completions and the prompt tokens the provider
+    served from its prefix cache.
+    """
+
+    def __init__(self, base_url=LLM_BASE_URL, max_connections=LLM_POOL_CONNECTIONS, http2=LLM_HTTP2):
+        self.base_url = base_url
+        self.max_connections = max_connections
+        self.http2 = http2
+        self._lock = threading.Lock()
+        self._client = None
+        self._stats = {
+            "calls": 0,
+            "errors": 0,
+            "total_seconds": 0.0,
+            "streamed_calls": 0,
+            "total_first_token_seconds": 0.0,
+            "prompt_tokens": 0,
+            "cached_prompt_tokens": 0,
+            "completion_tokens": 0,
+            "cache_hit_calls": 0,
+            "total_cache_hit_seconds": 0.0,
+            "requests": 0,
+            "new_connections": 0,
+        }
+        self._http_versions = {}
+        self._model_stats = {}
+
+    def _on_request(self, request):
+        # Counts TCP connects so reuse can be reported; runs before the request is sent
+        def trace(event_name, info):
+            if event_name == 'connection.connect_tcp.complete':
+                with self._lock:
+                    self._stats["new_connections"] += 1
+
+        request.extensions["trace"] = trace
+
+    def _on_response(self, response):
+        with self._lock:
+            self._stats["requests"] += 1
+            self._http_versions[response.http_version] = self._http_versions.get(response.http_version, 0) + 1
+
+    def _build_client(self):
+        http_client = httpx.Client(
+            http2=self.http2,
+            timeout=httpx.Timeout(
+                connect=LLM_CONNECT_TIMEOUT,
+                read=LLM_READ_TIMEOUT,
+                write=LLM_WRITE_TIMEOUT,
+                pool=LLM_POOL_TIMEOUT,
+            ),
+            limits=httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_connections,
+                keepalive_expiry=LLM_KEEPALIVE_EXPIRY,
+            ),
+            event_hooks={'request': [self._on_request], 'response': [self._on_response]},
+        )
+        client = OpenAI(
+            base_url=self.base_url,
+            api_key=os.getenv("GROQ_API_KEY"),
+            http_client=http_client,
+            max_retries=LLM_MAX_RETRIES,
+        )
+        logger.info(f"LLM client initialized for {self.base_url} (HTTP/2: {self.http2}, connections: {self.max_connections})")
+        return client
+
+    def get_client(self):
+        with self._lock:
+            if self._client is None:
+                self._client = self._build_client()
+            return self._client
+
+    def prewarm(self):
+        """
+        Open a pooled connection in the background so the first task skips the handshake
+        """
+        def warm():
+            try:
+                self.get_client().models.list()
+                logger.debug("LLM connection warmed")
+            except Exception as e:
+                logger.warning(f"Failed to warm LLM connection: {str(e)}")
+
+        threading.Thread(target=warm, name='llm-prewarm', daemon=True).start()
+
+    def record_call(self, model, seconds, failed=False, first_token_seconds=None, usage=None):
+        prompt_tokens, cached_tokens, completion_tokens = usage_counts(usage)
+        with self._lock:
+            self._stats["calls"] += 1
+            self._stats["total_seconds"] += seconds
+            if first_token_seconds is not None:
+                self._stats["streamed_calls"] += 1
+                self._stats["total_first_token_seconds"] += first_token_seconds
+            model_stats = self._model_stats.setdefault(model, {"calls": 0, "errors": 0, "total_seconds": 0.0, "max_seconds": 0.0})
+            model_stats["calls"] += 1
+            model_stats["total_seconds"] += seconds
+            model_stats["max_seconds"] = max(model_stats["max_seconds"], seconds)
+            self._stats["prompt_tokens"] += prompt_tokens
+            self._stats["cached_prompt_tokens"] += cached_tokens
+            self._stats["completion_tokens"] += completion_tokens
+            if cached_tokens:
+                # Calls that reused a cached prompt prefix, to compare their latency with the rest
+                self._stats["cache_hit_calls"] += 1
+                self._stats["total_cache_hit_seconds"] += seconds
+            if failed:
+                self._stats["errors"] += 1
+                model_stats["errors"] += 1
+
+    def stats(self):
+        """
+        Snapshot of client usage; reused_connections counts requests served without a new TCP connect
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            total_seconds = stats.pop("total_seconds")
+            stats["avg_seconds"] = round(total_seconds / stats["calls"], 3) if stats["calls"] else 0.0
+            total_cache_hit_seconds = stats.pop("total_cache_hit_seconds")
+            cache_miss_calls = stats["calls"] - stats["cache_hit_calls"]
+            stats["avg_cache_hit_seconds"] = (
+                round(total_cache_hit_seconds / stats["cache_hit_calls"], 3) if stats["cache_hit_calls"] else 0.0
+            )
+            stats["avg_cache_miss_seconds"] = (
+                round((total_seconds - total_cache_hit_seconds) / cache_miss_calls, 3) if cache_miss_calls else 0.0
+            )
+            stats["cached_prompt_ratio"] = (
+                round(stats["cached_prompt_tokens"] / stats["prompt_tokens"], 3) if stats["prompt_tokens"] else 0.0
+            )
+            total_first_token_seconds = stats.pop("total_first_token_seconds")
+            stats["avg_first_token_seconds"] = (
+                round(total_first_token_seconds / stats["streamed_calls"], 3) if stats["streamed_calls"] else 0.0
+            )
+            stats["reused_connections"] = max(stats["requests"] - stats["new_connections"], 0)
+            stats["http_versions"] = dict(self._http_versions)
+            stats["models"] = {
+                model: {
+                    "calls": values["calls"],
+                    "errors": values["errors"],
+                    "avg_seconds": round(values["total_seconds"] / values["calls"], 3) if values["calls"] else 0.0,
+                    "max_seconds": round(values["max_seconds"], 3),
+                }
+                for model, values in self._model_stats.items()
+            }
+            stats["initialized"] = self._client is not None
+        stats["http2"] = self.http2
+        stats["max_connections"] = self.max_connections
+        return stats
+
+
+llm_client = LLMClientManager()
+
+
+def get_llm_client_stats():
+    return llm_client.stats()
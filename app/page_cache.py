@@ -0,0 +1,254 @@
+import os
+import json
+import time
+import hashlib
+import tempfile
+import threading
+
+from app.dedupe import canonicalize_url
+from app.logger import setup_logger
+
+# Initialize logger
+logger = setup_logger('page_cache')
+
+# Constants
+# Kept outside data/ because rotate_data_files prunes every JSON file below it
+PAGE_CACHE_DIR = os.getenv("PAGE_CACHE_DIR", os.path.join('cache', 'pages'))
+PAGE_CACHE_TTL = int(os.getenv("PAGE_CACHE_TTL", str(6 * 60 * 60)))  # Seconds a fetched page is served without revalidation
+RENDER_CACHE_TTL = int(os.getenv("RENDER_CACHE_TTL", str(6 * 60 * 60)))  # Seconds a rendered page is reused
+PAGE_CACHE_MAX_MB = int(os.getenv("PAGE_CACHE_MAX_MB", "200"))
+PAGE_CACHE_RESCAN_INTERVAL = int(os.getenv("PAGE_CACHE_RESCAN_INTERVAL", "60"))  # Seconds between size rescans, to count other workers' writes
+PAGE_CACHE_ENABLED = os.getenv("PAGE_CACHE_ENABLED", "true").lower() not in {'0', 'false', 'no', 'off'}
+
+
+class PageCache:
+    """
+    On-disk cache of fetched page bodies and rendered page payloads.
+
+    Entries carry a TTL and the response validators (ETag / Last-Modified) so stale
+    pages can be revalidated with a conditional GET. Total size is bounded; the least
+    recently used entries are evicted first. The directory is shared by every worker
+    process, so the size index is rebuilt from disk before evicting and at least once
+    per rescan interval.
+    """
+
+    def __init__(
+        self,
+        cache_dir=PAGE_CACHE_DIR,
+        max_bytes=PAGE_CACHE_MAX_MB * 1024 * 1024,
+        rescan_interval=PAGE_CACHE_RESCAN_INTERVAL,
+        enabled=PAGE_CACHE_ENABLED,
+    ):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.rescan_interval = rescan_interval
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._sizes = None  # path -> size, loaded lazily
+        self._scanned_at = 0
+        self._stats = {"hits": 0, "misses": 0, "stale": 0, "revalidated": 0, "stores": 0, "evictions": 0}
+
+    def _path(self, url, kind):
+        digest = hashlib.sha256(f"{kind}:{canonicalize_url(url)}".encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, digest[:2], f"{digest}.json")
+
+    def _scan_sizes(self):
+        """
+        Called with the lock held: rebuild the size index from every worker's files on disk
+        """
+        self._sizes = {}
+        self._scanned_at = time.time()
+        if not os.path.exists(self.cache_dir):
+            return
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if name.endswith('.json'):
+                    path = os.path.join(root, name)
+                    try:
+                        self._sizes[path] = os.path.getsize(path)
+                    except OSError:
+                        pass
+
+    def _load_sizes(self):
+        if self._sizes is None or time.time() - self._scanned_at >= self.rescan_interval:
+            self._scan_sizes()
+
+    def _increment(self, key):
+        with self._lock:
+            self._stats[key] += 1
+
+    def _read(self, path):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+            os.utime(path)  # Mark as recently used for eviction
+            return entry
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Discarding unreadable cache entry {path}: {str(e)}")
+            self._remove(path)
+            return None
+
+    def _write(self, path, entry):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        data = json.dumps(entry, ensure_ascii=False).encode('utf-8')
+        # Unique per process and thread, so concurrent writers never share a temp file
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+        with self._lock:
+            self._load_sizes()
+            self._sizes[path] = len(data)
+            self._stats["stores"] += 1
+        self._evict()
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        with self._lock:
+            if self._sizes is not None:
+                self._sizes.pop(path, None)
+
+    def _evict(self):
+        with self._lock:
+            if sum(self._sizes.values()) <= self.max_bytes:
+                return
+            # Other workers may already have evicted, or written, entries this index does not know about
+            self._scan_sizes()
+            total = sum(self._sizes.values())
+            if total <= self.max_bytes:
+                return
+            paths = list(self._sizes)
+        # Oldest access time first
+        paths.sort(key=lambda p: os.path.getmtime(p) if os.path.exists(p) else 0)
+        for path in paths:
+            if total <= self.max_bytes:
+                break
+            with self._lock:
+                size = self._sizes.get(path, 0)
+            self._remove(path)
+            total -= size
+            self._increment("evictions")
+            logger.debug(f"Evicted page cache entry {path}")
+
+    def lookup(self, url):
+        """
+        Return the cached HTTP entry for url (fresh or stale) or None
+        """
+        if not self.enabled:
+            return None
+        entry = self._read(self._path(url, 'http'))
+        if entry is None:
+            self._increment("misses")
+        return entry
+
+    @staticmethod
+    def is_fresh(entry):
+        return bool(entry) and entry.get("expires_at", 0) > time.time()
+
+    def record_hit(self):
+        self._increment("hits")
+
+    @staticmethod
+    def conditional_headers(entry):
+        """
+        Validators to send with a conditional GET for a stale entry
+        """
+        headers = {}
+        if entry and entry.get("etag"):
+            headers['If-None-Match'] = entry["etag"]
+        if entry and entry.get("last_modified"):
+            headers['If-Modified-Since'] = entry["last_modified"]
+        return headers
+
+    def store_response(self, url, response, stale_entry=None):
+        """
+        Cache a successful response body with its validators
+        """
+        if stale_entry is not None:
+            self._increment("stale")
+        if not self.enabled:
+            return
+        if 'no-store' in response.headers.get('cache-control', '').lower():
+            return
+        entry = {
+            "url": url,
+            "body": response.text,
+            "etag": response.headers.get('etag'),
+            "last_modified": response.headers.get('last-modified'),
+            "stored_at": time.time(),
+            "expires_at": time.time() + PAGE_CACHE_TTL,
+        }
+        try:
+            self._write(self._path(url, 'http'), entry)
+        except OSError as e:
+            logger.warning(f"Failed to cache {url}: {str(e)}")
+
+    def revalidated(self, url, entry, response):
+        """
+        Extend a stale entry after a 304 Not Modified response
+        """
+        self._increment("revalidated")
+        entry["expires_at"] = time.time() + PAGE_CACHE_TTL
+        entry["etag"] = response.headers.get('etag', entry.get("etag"))
+        entry["last_modified"] = response.headers.get('last-modified', entry.get("last_modified"))
+        try:
+            self._write(self._path(url, 'http'), entry)
+        except OSError as e:
+            logger.warning(f"Failed to refresh cache entry for {url}: {str(e)}")
+        return entry
+
+    def get_rendered(self, url):
+        """
+        Return a fresh rendered page payload for url or None
+        """
+        if not self.enabled:
+            return None
+        entry = self._read(self._path(url, 'render'))
+        if entry and self.is_fresh(entry):
+            self._increment("hits")
+            return entry["payload"]
+        self._increment("misses")
+        return None
+
+    def store_rendered(self, url, payload):
+        if not self.enabled or not payload:
+            return
+        entry = {
+            "url": url,
+            "payload": payload,
+            "stored_at": time.time(),
+            "expires_at": time.time() + RENDER_CACHE_TTL,
+        }
+        try:
+            self._write(self._path(url, 'render'), entry)
+        except OSError as e:
+            logger.warning(f"Failed to cache rendered page {url}: {str(e)}")
+
+    def stats(self):
+        with self._lock:
+            self._load_sizes()
+            stats = dict(self._stats)
+            stats["entries"] = len(self._sizes)
+            stats["size_bytes"] = sum(self._sizes.values())
+        lookups = stats["hits"] + stats["revalidated"] + stats["misses"] + stats["stale"]
+        stats["hit_rate"] = round((stats["hits"] + stats["revalidated"]) / lookups, 3) if lookups else 0.0
+        return stats
+
+
+page_cache = PageCache()
+
+
+def get_page_cache_stats():
+    return page_cache.stats()
@@ -0,0 +1,64 @@
+import copy
+import threading
+
+from app.logger import setup_logger
+from app.status_store import set_status
+
+# Initialize logger
+logger = setup_logger('partial_results')
+
+
+class PartialResultPublisher:
+    """
+    Task status updates that carry the result fields completed so far.
+
+    The parallel completions of one analysis share a publisher: each streamed field
+    is merged into the partial result under its section, and every update republishes
+    the latest step together with that partial result as "partial_result".
+    """
+
+    def __init__(self, task_id, enabled=True):
+        self.task_id = task_id
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._status = None
+        self._partial = {}
+
+    def _publish(self):
+        # Called with the lock held so updates reach the store in order
+        if self._status is None:
+            return
+        status = dict(self._status)
+        if self._partial:
+            status["partial_result"] = copy.deepcopy(self._partial)
+        set_status(self.task_id, status)
+
+    def set_step(self, status):
+        if not self.task_id:
+            return
+        with self._lock:
+            self._status = dict(status)
+            self._publish()
+
+    def add_field(self, section, key, value):
+        with self._lock:
+            target = self._partial.setdefault(section, {}) if section else self._partial
+            target[key] = value
+            try:
+                self._publish()
+            except Exception as e:
+                logger.error(f"Failed to publish partial result for task {self.task_id}: {str(e)}")
+
+    def field_callback(self, section=None, keys=None):
+        """
+        Callback for call_openai's on_field, or None when partial results are off
+        keys limits which fields are published (e.g. the FAQ call's fields merged into the result)
+        """
+        if not (self.enabled and self.task_id):
+            return None
+
+        def on_field(key, value):
+            if keys is None or key in keys:
+                self.add_field(section, key, value)
+
+        return on_field
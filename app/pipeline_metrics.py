@@ -0,0 +1,75 @@
+import time
+import threading
+from contextlib import contextmanager
+
+from app.logger import setup_logger
+
+# Initialize logger
+logger = setup_logger('pipeline_metrics')
+
+# Constants
+TRANSLATION_MODE_NATIVE = 'native'  # Prompts read the source language and answer in the response language
+TRANSLATION_MODE_TRANSLATE = 'translate'  # Translate pages to English, analyse, translate the result back
+TRANSLATION_MODES = (TRANSLATION_MODE_NATIVE, TRANSLATION_MODE_TRANSLATE)
+
+
+class StageTimer:
+    """
+    Wall-clock seconds spent in each stage of one analysis run
+    """
+
+    def __init__(self):
+        self.seconds = {}
+
+    @contextmanager
+    def stage(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.seconds[name] = round(self.seconds.get(name, 0.0) + time.perf_counter() - started, 3)
+
+    def total(self):
+        return round(sum(self.seconds.values()), 3)
+
+
+class PipelineMetrics:
+    """
+    Aggregates stage timings per (translation mode, response language) so the native
+    and translate pipelines can be compared on real traffic
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._runs = {}
+
+    def record(self, translation_mode, response_language, timer):
+        key = f"{translation_mode}:{response_language}"
+        with self._lock:
+            entry = self._runs.setdefault(key, {"runs": 0, "stage_seconds": {}, "total_seconds": 0.0})
+            entry["runs"] += 1
+            entry["total_seconds"] += timer.total()
+            for name, seconds in timer.seconds.items():
+                entry["stage_seconds"][name] = entry["stage_seconds"].get(name, 0.0) + seconds
+        logger.info(f"Analysis in {key} mode took {timer.total()}s: {timer.seconds}")
+
+    def stats(self):
+        with self._lock:
+            return {
+                key: {
+                    "runs": entry["runs"],
+                    "avg_total_seconds": round(entry["total_seconds"] / entry["runs"], 3),
+                    "avg_stage_seconds": {
+                        name: round(seconds / entry["runs"], 3)
+                        for name, seconds in entry["stage_seconds"].items()
+                    },
+                }
+                for key, entry in self._runs.items()
+            }
+
+
+pipeline_metrics = PipelineMetrics()
+
+
+def get_pipeline_stats():
+    return pipeline_metrics.stats()
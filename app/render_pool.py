@@ -0,0 +1,374 @@
+import os
+import asyncio
+import threading
+from urllib.parse import urlparse
+
+from pyppeteer import launch
+
+from app.logger import setup_logger
+
+# Initialize logger
+logger = setup_logger('render_pool')
+
+# Constants
+RENDER_POOL_BROWSERS = int(os.getenv("RENDER_POOL_BROWSERS", "2"))  # Long-lived Chromium instances
+RENDER_POOL_TABS_PER_BROWSER = int(os.getenv("RENDER_POOL_TABS_PER_BROWSER", "2"))  # Concurrent renders per browser
+RENDER_POOL_MAX_PAGES_PER_BROWSER = int(os.getenv("RENDER_POOL_MAX_PAGES_PER_BROWSER", "50"))  # Recycle after this many renders
+RENDER_PROFILE = os.getenv("RENDER_PROFILE", "lean")  # Default entry of RENDER_PROFILES
+RENDER_WAIT_FOR_SELECTOR = os.getenv("RENDER_WAIT_FOR_SELECTOR")  # Optional selector to wait for after navigation
+RENDER_TIMEOUT = 60  # Seconds for a whole render including waiting for a free tab
+BROWSER_ARGS = [
+    '--no-sandbox',
+    '--disable-setuid-sandbox',
+    '--disable-dev-shm-usage',
+    '--disable-accelerated-2d-canvas',
+    '--disable-gpu'
+]
+TRACKER_DOMAINS = [
+    'google-analytics.com',
+    'googletagmanager.com',
+    'googlesyndication.com',
+    'googleadservices.com',
+    'doubleclick.net',
+    'adservice.google.com',
+    'connect.facebook.net',
+    'facebook.net',
+    'analytics.tiktok.com',
+    'snap.licdn.com',
+    'bat.bing.com',
+    'clarity.ms',
+    'hotjar.com',
+    'fullstory.com',
+    'segment.io',
+    'segment.com',
+    'mixpanel.com',
+    'amplitude.com',
+    'heap.io',
+    'hs-analytics.net',
+    'hs-banner.com',
+    'optimizely.com',
+    'nr-data.net',
+    'scorecardresearch.com',
+    'quantserve.com',
+    'criteo.com',
+    'taboola.com',
+    'outbrain.com',
+    'amazon-adsystem.com',
+    'adsrvr.org',
+]
+# Render profiles: which requests to abort and how to decide the page is ready.
+# "lean" only needs text, headings and links; "full" matches the original behaviour.
+RENDER_PROFILES = {
+    "lean": {
+        "block_resource_types": {'image', 'media', 'font', 'stylesheet'},
+        "block_trackers": True,
+        "wait_until": 'domcontentloaded',
+        "navigation_timeout": 20000,  # Milliseconds for page.goto
+        "settle_ms": 750,  # Extra time for client-side rendering after DOMContentLoaded
+        "wait_for_selector": None,
+        "selector_timeout": 5000,
+    },
+    "full": {
+        "block_resource_types": set(),
+        "block_trackers": False,
+        "wait_until": 'networkidle0',
+        "navigation_timeout": 30000,
+        "settle_ms": 0,
+        "wait_for_selector": None,
+        "selector_timeout": 5000,
+    },
+}
+
+# Runs inside the page and returns only what the scraper needs, mirroring
+# app.extraction.extract_page, instead of the full HTML document.
+EXTRACT_PAGE_SCRIPT = """
+() => {
+    const clean = (text) => (text || '').replace(/\\s+/g, ' ').trim();
+    const meta = document.querySelector('meta[name="description"]');
+    const lines = [];
+    document.querySelectorAll('h1, h2, h3, p, li, span').forEach((element) => {
+        const text = clean(element.textContent);
+        const parent = element.parentElement;
+        if (text && !(parent && parent.closest('h1, h2, h3, p, li, span'))) {
+            lines.push(element.tagName.toUpperCase() + ': ' + text);
+        }
+    });
+    return {
+        title: document.title || '',
+        description: meta ? (meta.getAttribute('content') || '') : '',
+        lines: lines,
+        links: Array.from(document.querySelectorAll('a[href]'), (a) => [a.href, clean(a.textContent)]),
+    };
+}
+"""
+
+
+def get_render_profile(name=None, **overrides):
+    """
+    Resolve a render profile by name, applying the environment selector and any overrides
+    """
+    profile_name = name or RENDER_PROFILE
+    if profile_name not in RENDER_PROFILES:
+        logger.warning(f"Unknown render profile {profile_name}, using lean")
+        profile_name = "lean"
+    profile = dict(RENDER_PROFILES[profile_name], name=profile_name)
+    if RENDER_WAIT_FOR_SELECTOR and not profile["wait_for_selector"]:
+        profile["wait_for_selector"] = RENDER_WAIT_FOR_SELECTOR
+    profile.update(overrides)
+    return profile
+
+
+def is_tracker_url(url):
+    host = (urlparse(url).hostname or '').lower()
+    return any(host == domain or host.endswith('.' + domain) for domain in TRACKER_DOMAINS)
+
+
+class _Tab:
+    """
+    A reusable browser tab and the render profile its request filter applies
+    """
+
+    def __init__(self, page):
+        self.page = page
+        self.profile = RENDER_PROFILES["full"]
+
+
+class _BrowserSlot:
+    """
+    One long-lived browser and its idle tabs
+    """
+
+    def __init__(self, index):
+        self.index = index
+        self.browser = None
+        self.idle_tabs = []
+        self.active = 0
+        self.pages_served = 0
+        self.retiring = False
+        self.launch_lock = asyncio.Lock()
+
+
+class RenderPool:
+    """
+    Pool of warm headless browsers serving concurrent render requests.
+
+    Browsers run on a dedicated event loop thread. Each one serves a bounded number of
+    tabs at a time, is health-checked before use and is recycled after
+    max_pages_per_browser renders to keep Chromium memory in check.
+    """
+
+    def __init__(
+        self,
+        browsers=RENDER_POOL_BROWSERS,
+        tabs_per_browser=RENDER_POOL_TABS_PER_BROWSER,
+        max_pages_per_browser=RENDER_POOL_MAX_PAGES_PER_BROWSER,
+    ):
+        self.browsers = browsers
+        self.tabs_per_browser = tabs_per_browser
+        self.max_pages_per_browser = max_pages_per_browser
+        self._lock = threading.Lock()
+        self._loop = None
+        self._slots = None  # Created on the pool loop
+        self._condition = None
+        self._stats = {
+            "renders": 0,
+            "failures": 0,
+            "launches": 0,
+            "recycles": 0,
+            "tabs_opened": 0,
+            "blocked_requests": 0,
+        }
+
+    def _ensure_loop(self):
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name='render-pool', daemon=True).start()
+                self._loop = loop
+            return self._loop
+
+    def _increment(self, key):
+        with self._lock:
+            self._stats[key] += 1
+
+    async def _launch(self, slot):
+        # Signal handlers can only be installed from the main thread
+        slot.browser = await launch(
+            headless=True,
+            args=BROWSER_ARGS,
+            handleSIGINT=False,
+            handleSIGTERM=False,
+            handleSIGHUP=False,
+        )
+        slot.idle_tabs = []
+        slot.pages_served = 0
+        self._increment("launches")
+        logger.info(f"Launched browser {slot.index}")
+
+    async def _close(self, slot):
+        browser, slot.browser = slot.browser, None
+        slot.idle_tabs = []
+        if browser:
+            try:
+                await browser.close()
+            except Exception as e:
+                logger.debug(f"Error closing browser {slot.index}: {str(e)}")
+
+    def _is_healthy(self, slot):
+        if slot.browser is None:
+            return False
+        process = getattr(slot.browser, 'process', None)
+        return process is None or process.poll() is None
+
+    async def _acquire(self):
+        if self._slots is None:
+            self._slots = [_BrowserSlot(index) for index in range(self.browsers)]
+            self._condition = asyncio.Condition()
+
+        async with self._condition:
+            while True:
+                available = [
+                    slot for slot in self._slots
+                    if slot.active < self.tabs_per_browser and not slot.retiring
+                ]
+                if available:
+                    slot = min(available, key=lambda candidate: candidate.active)
+                    slot.active += 1
+                    break
+                await self._condition.wait()
+
+        try:
+            async with slot.launch_lock:
+                if not self._is_healthy(slot):
+                    await self._close(slot)
+                    await self._launch(slot)
+            tab = None
+            while slot.idle_tabs and tab is None:
+                candidate = slot.idle_tabs.pop()
+                if not candidate.page.isClosed():
+                    tab = candidate
+            if tab is None:
+                tab = await self._open_tab(slot)
+            return slot, tab
+        except Exception:
+            await self._release_slot(slot)
+            raise
+
+    async def _open_tab(self, slot):
+        page = await slot.browser.newPage()
+        await page.setViewport({'width': 1280, 'height': 800})
+        tab = _Tab(page)
+        await page.setRequestInterception(True)
+        page.on('request', lambda request: asyncio.ensure_future(self._filter_request(tab, request)))
+        self._increment("tabs_opened")
+        return tab
+
+    async def _filter_request(self, tab, request):
+        profile = tab.profile
+        try:
+            if (
+                request.resourceType in profile["block_resource_types"]
+                or (profile["block_trackers"] and is_tracker_url(request.url))
+            ):
+                self._increment("blocked_requests")
+                await request.abort()
+            else:
+                await request.continue_()
+        except Exception as e:
+            # The request may already be handled if the tab navigated away
+            logger.debug(f"Request interception error for {request.url}: {str(e)}")
+
+    async def _release_slot(self, slot):
+        async with self._condition:
+            slot.active -= 1
+            if slot.pages_served >= self.max_pages_per_browser:
+                slot.retiring = True
+            if slot.retiring and slot.active == 0:
+                logger.info(f"Recycling browser {slot.index} after {slot.pages_served} pages")
+                await self._close(slot)
+                slot.retiring = False
+                self._increment("recycles")
+            self._condition.notify_all()
+
+    async def _release(self, slot, tab, reusable):
+        slot.pages_served += 1
+        if reusable and not tab.page.isClosed():
+            try:
+                await tab.page.goto('about:blank')
+                slot.idle_tabs.append(tab)
+            except Exception:
+                reusable = False
+        if not reusable:
+            try:
+                await tab.page.close()
+            except Exception:
+                pass
+        await self._release_slot(slot)
+
+    async def _render(self, url, profile):
+        slot, tab = await self._acquire()
+        tab.profile = profile
+        page = tab.page
+        reusable = True
+        try:
+            await page.goto(url, {'waitUntil': profile["wait_until"], 'timeout': profile["navigation_timeout"]})
+            if profile["wait_for_selector"]:
+                try:
+                    await page.waitForSelector(profile["wait_for_selector"], {'timeout': profile["selector_timeout"]})
+                except Exception:
+                    logger.debug(f"Selector {profile['wait_for_selector']} not found on {url}, extracting anyway")
+            if profile["settle_ms"]:
+                await asyncio.sleep(profile["settle_ms"] / 1000)
+            result = await page.evaluate(EXTRACT_PAGE_SCRIPT)
+            self._increment("renders")
+            return result
+        except asyncio.CancelledError:
+            reusable = False
+            raise
+        except Exception as e:
+            reusable = False
+            self._increment("failures")
+            logger.error(f"Error rendering {url}: {str(e)}")
+            return None
+        finally:
+            await self._release(slot, tab, reusable)
+
+    async def render(self, url, profile=None):
+        """
+        Render url in a pooled tab; awaitable from any event loop
+        profile is a name from RENDER_PROFILES or a dict from get_render_profile
+        Returns dict(title, description, lines, links) or None on failure; links are [href, anchor text] pairs
+        """
+        if not isinstance(profile, dict):
+            profile = get_render_profile(profile)
+        loop = self._ensure_loop()
+        future = asyncio.run_coroutine_threadsafe(self._render(url, profile), loop)
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout=RENDER_TIMEOUT)
+        except asyncio.TimeoutError:
+            self._increment("failures")
+            logger.error(f"Timed out rendering {url}")
+            return None
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        slots = self._slots or []
+        stats["browsers"] = [
+            {
+                "index": slot.index,
+                "running": slot.browser is not None,
+                "active_tabs": slot.active,
+                "idle_tabs": len(slot.idle_tabs),
+                "pages_served": slot.pages_served,
+            }
+            for slot in slots
+        ]
+        return stats
+
+
+render_pool = RenderPool()
+
+
+def get_render_stats():
+    return render_pool.stats()
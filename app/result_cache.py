@@ -0,0 +1,181 @@
+import os
+import json
+import time
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict
+
+from app.logger import setup_logger
+
+# Initialize logger
+logger = setup_logger('result_cache')
+
+# Constants
+RESULT_CACHE_DIR = os.getenv("RESULT_CACHE_DIR", os.path.join('cache', 'results'))
+RESULT_CACHE_TTL = int(os.getenv("RESULT_CACHE_TTL", str(7 * 24 * 60 * 60)))  # Seconds a result stays valid
+RESULT_CACHE_MEMORY_ENTRIES = int(os.getenv("RESULT_CACHE_MEMORY_ENTRIES", "256"))
+RESULT_CACHE_DISK_ENTRIES = int(os.getenv("RESULT_CACHE_DISK_ENTRIES", "2000"))
+RESULT_CACHE_ENABLED = os.getenv("RESULT_CACHE_ENABLED", "true").lower() not in {'0', 'false', 'no', 'off'}
+
+
+def make_result_key(
+    combined_content,
+    prompt_version,
+    models,
+    data_type,
+    agent_type=None,
+    include_brand_intelligence=False,
+    response_language=None
+):
+    """
+    Content-addressed key for an LLM analysis result
+    response_language is set when the prompts generate in that language (native mode)
+    """
+    key_material = json.dumps(
+        {
+            "content_sha256": hashlib.sha256(combined_content.encode('utf-8')).hexdigest(),
+            "prompt_version": prompt_version,
+            "models": list(models),
+            "data_type": data_type,
+            "agent_type": agent_type,
+            "include_brand_intelligence": bool(include_brand_intelligence),
+            "response_language": response_language,
+        },
+        sort_keys=True
+    )
+    return hashlib.sha256(key_material.encode('utf-8')).hexdigest()
+
+
+class ResultCache:
+    """
+    Two-tier cache of parsed LLM results: an in-memory LRU in front of JSON files on disk.
+
+    Values are kept serialized so callers always receive a fresh copy they can mutate.
+    """
+
+    def __init__(
+        self,
+        cache_dir=RESULT_CACHE_DIR,
+        ttl=RESULT_CACHE_TTL,
+        memory_entries=RESULT_CACHE_MEMORY_ENTRIES,
+        disk_entries=RESULT_CACHE_DISK_ENTRIES,
+        enabled=RESULT_CACHE_ENABLED,
+    ):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.memory_entries = memory_entries
+        self.disk_entries = disk_entries
+        self.enabled = enabled
+        self._memory = OrderedDict()  # key -> (expires_at, serialized value)
+        self._lock = threading.Lock()
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _remember(self, key, expires_at, serialized):
+        with self._lock:
+            self._memory[key] = (expires_at, serialized)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+    def get(self, key):
+        """
+        Return a copy of the cached result for key, or None
+        """
+        if not self.enabled:
+            return None
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry and entry[0] > now:
+                self._memory.move_to_end(key)
+                self._stats["memory_hits"] += 1
+                return json.loads(entry[1])
+            if entry:
+                del self._memory[key]
+
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                stored = json.load(f)
+            if stored["expires_at"] > now:
+                serialized = json.dumps(stored["value"], ensure_ascii=False)
+                self._remember(key, stored["expires_at"], serialized)
+                with self._lock:
+                    self._stats["disk_hits"] += 1
+                return stored["value"]
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Discarding unreadable result cache entry {path}: {str(e)}")
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+        with self._lock:
+            self._stats["misses"] += 1
+        return None
+
+    def set(self, key, value):
+        if not self.enabled:
+            return
+        expires_at = time.time() + self.ttl
+        serialized = json.dumps(value, ensure_ascii=False)
+        self._remember(key, expires_at, serialized)
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            path = self._path(key)
+            # Unique per process and thread, so concurrent writers never share a temp file
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    f.write(json.dumps({"expires_at": expires_at, "value": value}, ensure_ascii=False))
+                os.replace(tmp_path, path)
+            except OSError:
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+                raise
+            with self._lock:
+                self._stats["stores"] += 1
+            self._evict_disk()
+        except OSError as e:
+            logger.warning(f"Failed to persist result cache entry {key}: {str(e)}")
+
+    def _evict_disk(self):
+        files = [
+            os.path.join(self.cache_dir, name)
+            for name in os.listdir(self.cache_dir)
+            if name.endswith('.json')
+        ]
+        if len(files) <= self.disk_entries:
+            return
+        files.sort(key=lambda path: os.path.getmtime(path))
+        for path in files[:len(files) - self.disk_entries]:
+            try:
+                os.remove(path)
+                with self._lock:
+                    self._stats["evictions"] += 1
+            except OSError:
+                pass
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["memory_entries"] = len(self._memory)
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = round((stats["memory_hits"] + stats["disk_hits"]) / lookups, 3) if lookups else 0.0
+        return stats
+
+
+result_cache = ResultCache()
+
+
+def get_result_cache_stats():
+    return result_cache.stats()
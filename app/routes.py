@@ -1,17 +1,66 @@
-from flask import Blueprint, jsonify, request
-from app.utils import process_content, analyze_url
+from flask import Blueprint, Response, jsonify, request, stream_with_context
+from app.utils import process_content, analyze_url, TRANSLATION_MODE
 from app.logger import setup_logger
-from app.status_store import set_status, get_status
+from app.status_store import set_status, get_status, wait_for_status, get_status_store_stats, FINISHED_STEPS
+from app.http_pool import get_pool_stats
+from app.render_pool import get_render_stats
+from app.page_cache import get_page_cache_stats
+from app.result_cache import get_result_cache_stats
+from app.discovery import get_discovery_stats
+from app.domain_strategy import get_domain_strategy_stats
+from app.translation_memory import get_translation_memory_stats
+from app.pipeline_metrics import get_pipeline_stats, TRANSLATION_MODES
+from app.job_queue import job_scheduler, QueueFullError, get_job_queue_stats
+from app.single_flight import single_flight, make_request_key, get_single_flight_stats
+from app.llm_client import get_llm_client_stats
 from app.university_prompts import resolve_agent_key, UNIVERSITY_AGENT_TYPES
+import os
+import json
+import time
 import uuid
 import threading
 
 # Initialize logger
 logger = setup_logger('routes')
 
+# Constants
+LONG_POLL_MAX_SECONDS = int(os.getenv("LONG_POLL_MAX_SECONDS", "30"))
+SSE_KEEPALIVE_SECONDS = int(os.getenv("SSE_KEEPALIVE_SECONDS", "15"))
+SSE_MAX_SECONDS = int(os.getenv("SSE_MAX_SECONDS", "300"))  # Clients reconnect with Last-Event-ID after this
+# Open SSE streams and long-polls per worker. Each holds a gunicorn thread, so keep this
+# below --threads or /health and every other endpoint can be starved.
+STATUS_WATCHER_LIMIT = int(os.getenv("STATUS_WATCHER_LIMIT", "4"))
+STATUS_WATCHER_RETRY_AFTER = 5  # Seconds clients are told to wait before retrying (or falling back to plain polling)
+
+_watcher_lock = threading.Lock()
+_watcher_stats = {"active": 0, "rejected": 0}
+
 main = Blueprint('main', __name__)
 
 
+def acquire_watcher_slot():
+    """
+    Reserve one of the STATUS_WATCHER_LIMIT slots for a stream or long-poll; False when all are taken
+    """
+    with _watcher_lock:
+        if _watcher_stats["active"] >= STATUS_WATCHER_LIMIT:
+            _watcher_stats["rejected"] += 1
+            return False
+        _watcher_stats["active"] += 1
+        return True
+
+def release_watcher_slot():
+    with _watcher_lock:
+        _watcher_stats["active"] -= 1
+
+def watchers_busy_response():
+    response = jsonify({
+        'error': 'Too many open status watchers, retry later or poll without since_version',
+        'retry_after': STATUS_WATCHER_RETRY_AFTER
+    })
+    response.headers['Retry-After'] = str(STATUS_WATCHER_RETRY_AFTER)
+    return response, 503
+
 def parse_optional_boolean(value, field_name):
     if value is None:
         return False
@@ -58,6 +107,7 @@ def analyze_url_endpoint():
         url = data['url']
         max_pages = data.get('max_pages', 4)  # Default to 4 if not specified
         response_language = data.get('response_language', 'en')  # Default to English if not specified
+        translation_mode = data.get('translation_mode')  # Defaults to the TRANSLATION_MODE setting
         requested_data_type = data.get('analysis_mode') or data.get('data_type') or data.get('entity_type')
         raw_agent_type = data.get('agent_type')
         raw_include_brand_intelligence = (
@@ -93,6 +143,10 @@ def analyze_url_endpoint():
             logger.warning(f"Invalid response_language: {response_language}")
             return jsonify({'error': 'response_language must be either "en" or "ja"'}), 400
 
+        if translation_mode is not None and translation_mode not in TRANSLATION_MODES:
+            logger.warning(f"Invalid translation_mode: {translation_mode}")
+            return jsonify({'error': 'translation_mode must be either "native" or "translate"'}), 400
+
         try:
             include_brand_intelligence = parse_optional_boolean(
                 raw_include_brand_intelligence,
@@ -124,10 +178,40 @@ def analyze_url_endpoint():
             logger.warning(f"Invalid max_pages format: {max_pages}")
             return jsonify({'error': 'max_pages must be a valid integer'}), 400
         
+        # Resolve defaults so requests that omit a parameter coalesce with ones that send its default
+        translation_mode = translation_mode or TRANSLATION_MODE
+
         task_id = str(uuid.uuid4())
-        set_status(task_id, {"step": "queued", "progress": 0, "message": "Task queued"})
+        request_key = make_request_key(
+            url,
+            max_pages,
+            data_type,
+            agent_key,
+            response_language,
+            include_brand_intelligence,
+            translation_mode
+        )
+
+        leader_id = single_flight.join(request_key, task_id)
+        if leader_id is not None:
+            # Identical analysis already in flight; this task mirrors its progress and result
+            leader_status = get_status(leader_id) or {}
+            return jsonify({
+                "task_id": task_id,
+                "queue_position": leader_status.get("queue_position", 0),
+                "coalesced": True
+            }), 202
 
-        def background_task(url, max_pages, task_id, response_language, data_type, agent_key, include_brand_intelligence):
+        def background_task(
+            url,
+            max_pages,
+            task_id,
+            response_language,
+            data_type,
+            agent_key,
+            include_brand_intelligence,
+            translation_mode
+        ):
             try:
                 analyze_url(
                     url,
@@ -136,18 +220,42 @@ def analyze_url_endpoint():
                     response_language=response_language,
                     data_type=data_type,
                     agent_type=agent_key,
-                    include_brand_intelligence=include_brand_intelligence
+                    include_brand_intelligence=include_brand_intelligence,
+                    translation_mode=translation_mode
                 )
             except Exception as e:
                 set_status(task_id, {"step": "error", "progress": 100, "message": str(e)})
+            finally:
+                single_flight.finish(request_key, task_id)
 
-        thread = threading.Thread(
-            target=background_task,
-            args=(url, max_pages, task_id, response_language, data_type, agent_key, include_brand_intelligence)
-        )
-        thread.start()
+        try:
+            queue_position = job_scheduler.submit(
+                task_id,
+                background_task,
+                url,
+                max_pages,
+                task_id,
+                response_language,
+                data_type,
+                agent_key,
+                include_brand_intelligence,
+                translation_mode
+            )
+        except QueueFullError as exc:
+            logger.warning(f"Rejecting analysis of {url}: {str(exc)}")
+            # Requests that attached in the meantime must not wait on a task that never runs
+            set_status(task_id, {"step": "error", "progress": 100, "message": "Too many analyses in progress, please retry later"})
+            single_flight.finish(request_key, task_id)
+            response = jsonify({'error': 'Too many analyses in progress, please retry later', 'retry_after': exc.retry_after})
+            response.headers['Retry-After'] = str(exc.retry_after)
+            return response, 429
+        except BaseException as exc:
+            # Any other failure to queue leaves no task to clear the in-flight entry
+            set_status(task_id, {"step": "error", "progress": 100, "message": f"Failed to start analysis: {str(exc)}"})
+            single_flight.finish(request_key, task_id)
+            raise
 
-        return jsonify({"task_id": task_id}), 202
+        return jsonify({"task_id": task_id, "queue_position": queue_position}), 202
     except Exception as e:
         logger.error(f"Error analyzing URL: {str(e)}")
         return jsonify({'error': str(e)}), 500
@@ -157,10 +265,88 @@ def health_check():
     logger.debug("Health check request received")
     return jsonify({'status': 'healthy'})
 
+@main.route('/api/stats', methods=['GET'])
+def stats():
+    logger.debug("Stats request received")
+    return jsonify({
+        'http_pool': get_pool_stats(),
+        'render_pool': get_render_stats(),
+        'page_cache': get_page_cache_stats(),
+        'result_cache': get_result_cache_stats(),
+        'discovery': get_discovery_stats(),
+        'domain_strategy': get_domain_strategy_stats(),
+        'translation_memory': get_translation_memory_stats(),
+        'pipeline': get_pipeline_stats(),
+        'job_queue': get_job_queue_stats(),
+        'status_store': get_status_store_stats(),
+        'single_flight': get_single_flight_stats(),
+        'llm_client': get_llm_client_stats(),
+        'status_watchers': dict(_watcher_stats, limit=STATUS_WATCHER_LIMIT),
+    })
+
 @main.route('/api/analyze-status', methods=['GET'])
 def analyze_status():
+    """
+    Current task status. With since_version, long-polls until the status version
+    exceeds it (or timeout seconds pass, answering 204 No Content). Long-polls share
+    the STATUS_WATCHER_LIMIT slots with streams and get 503 when none is free.
+    """
     task_id = request.args.get('task_id')
-    status = get_status(task_id)
+    since_version = request.args.get('since_version', type=int)
+    if since_version is None:
+        status = get_status(task_id)
+    else:
+        timeout = min(request.args.get('timeout', LONG_POLL_MAX_SECONDS, type=float), LONG_POLL_MAX_SECONDS)
+        if not acquire_watcher_slot():
+            return watchers_busy_response()
+        try:
+            status = wait_for_status(task_id, since_version, max(timeout, 0))
+        finally:
+            release_watcher_slot()
+        if status is not None and status["version"] <= since_version:
+            return '', 204
     if status is None:
         return jsonify({"error": "Task not found"}), 404
-    return jsonify(status) 
+    return jsonify(status)
+
+@main.route('/api/analyze-stream', methods=['GET'])
+def analyze_stream():
+    """
+    Server-Sent Events stream of task status updates, one "status" event per version
+    The stream ends after the done or error status; reconnects resume from Last-Event-ID.
+    Answers 503 with Retry-After when STATUS_WATCHER_LIMIT streams and long-polls are open.
+    """
+    task_id = request.args.get('task_id')
+    since_version = request.headers.get('Last-Event-ID', type=int)
+    if since_version is None:
+        since_version = request.args.get('since_version', 0, type=int)
+    if get_status(task_id) is None:
+        return jsonify({"error": "Task not found"}), 404
+    if not acquire_watcher_slot():
+        return watchers_busy_response()
+
+    def events():
+        version = since_version
+        deadline = time.monotonic() + SSE_MAX_SECONDS
+        yield "retry: 1000\n\n"
+        while time.monotonic() < deadline:
+            status = wait_for_status(task_id, version, min(SSE_KEEPALIVE_SECONDS, deadline - time.monotonic()))
+            if status is None:
+                yield f"event: error\ndata: {json.dumps({'error': 'Task not found'})}\n\n"
+                return
+            if status["version"] <= version:
+                if status.get("step") in FINISHED_STEPS:
+                    return  # Reconnected after the final event
+                yield ": keepalive\n\n"
+                continue
+            version = status["version"]
+            yield f"id: {version}\nevent: status\ndata: {json.dumps(status, ensure_ascii=False)}\n\n"
+            if status.get("step") in FINISHED_STEPS:
+                return
+
+    response = Response(stream_with_context(events()), mimetype='text/event-stream')
+    # Released when the server closes the response, including on client disconnect
+    response.call_on_close(release_watcher_slot)
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # Stop proxies from buffering the stream
+    return response
@@ -0,0 +1,76 @@
+import threading
+
+from app.dedupe import canonicalize_url
+from app.logger import setup_logger
+from app.status_store import add_status_mirror, remove_status_mirrors
+
+# Initialize logger
+logger = setup_logger('single_flight')
+
+
+def make_request_key(url, max_pages, data_type, agent_type, response_language, include_brand_intelligence, translation_mode):
+    """
+    Normalized identity of an analysis request; equal keys produce the same result
+    """
+    return (
+        canonicalize_url(url),
+        int(max_pages),
+        data_type,
+        agent_type,
+        response_language,
+        bool(include_brand_intelligence),
+        translation_mode,
+    )
+
+
+class SingleFlight:
+    """
+    Coalesces identical analysis requests while one is in flight.
+
+    The first request for a key runs the pipeline; later ones get their own task id
+    that mirrors every status of the running task, result included, so duplicate
+    concurrent work is never paid for twice.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._inflight = {}  # request key -> task id running it
+        self._stats = {"leaders": 0, "coalesced": 0}
+
+    def join(self, key, task_id):
+        """
+        Attach task_id to the in-flight task for key and return that task's id,
+        or register task_id as the one running key and return None
+        """
+        with self._lock:
+            leader_id = self._inflight.get(key)
+            if leader_id is None:
+                self._inflight[key] = task_id
+                self._stats["leaders"] += 1
+                return None
+            self._stats["coalesced"] += 1
+            add_status_mirror(leader_id, task_id)
+        logger.info(f"Task {task_id} attached to in-flight task {leader_id}")
+        return leader_id
+
+    def finish(self, key, task_id):
+        """
+        Forget the in-flight task once its final status is set
+        """
+        with self._lock:
+            if self._inflight.get(key) == task_id:
+                del self._inflight[key]
+            remove_status_mirrors(task_id)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["in_flight"] = len(self._inflight)
+        return stats
+
+
+single_flight = SingleFlight()
+
+
+def get_single_flight_stats():
+    return single_flight.stats()
@@ -1,12 +1,355 @@
-from threading import Lock
+import os
+import json
+import time
+import sqlite3
+import threading
+from collections import OrderedDict
+
+from app.logger import setup_logger
+
+# Initialize logger
+logger = setup_logger('status_store')
+
+# Constants
+STATUS_BACKEND = os.getenv("STATUS_BACKEND", "sqlite")  # sqlite (shared by all worker processes) or memory
+STATUS_DB_PATH = os.getenv("STATUS_DB_PATH", os.path.join('cache', 'status.sqlite3'))
+STATUS_TTL_ACTIVE = int(os.getenv("STATUS_TTL_ACTIVE", str(2 * 60 * 60)))  # Seconds an unfinished task is kept after its last update
+STATUS_TTL_FINISHED = int(os.getenv("STATUS_TTL_FINISHED", str(60 * 60)))  # Seconds a finished task and its result are kept
+STATUS_STORE_MAX_MB = int(os.getenv("STATUS_STORE_MAX_MB", "64"))
+STATUS_SWEEP_INTERVAL = int(os.getenv("STATUS_SWEEP_INTERVAL", "60"))  # Seconds between expiry sweeps
+STATUS_POLL_INTERVAL = float(os.getenv("STATUS_POLL_INTERVAL", "0.25"))  # Seconds between checks for updates from other processes
+FINISHED_STEPS = {'done', 'error'}
+
+
+def _serialize(status):
+    return json.dumps(status, ensure_ascii=False, separators=(',', ':'), default=str).encode('utf-8')
+
+def _ttl(status):
+    return STATUS_TTL_FINISHED if status.get("step") in FINISHED_STEPS else STATUS_TTL_ACTIVE
+
+def _deserialize(serialized, version):
+    status = json.loads(serialized)
+    status["version"] = version
+    return status
+
+
+class MemoryStatusStore:
+    """
+    Task statuses with per-entry TTLs and an LRU byte budget, private to this process.
+
+    Each status is serialized once when set, so finished results are held as one
+    compact string rather than live nested objects, and the byte budget is exact.
+    Readers get a fresh copy carrying the entry version, which increases on every
+    update. A background thread drops expired entries.
+    """
+
+    def __init__(self, max_bytes=STATUS_STORE_MAX_MB * 1024 * 1024, sweep_interval=STATUS_SWEEP_INTERVAL):
+        self.max_bytes = max_bytes
+        self.sweep_interval = sweep_interval
+        self._lock = threading.Condition()  # Notified on every update
+        self._entries = OrderedDict()  # task_id -> (expires_at, version, serialized status)
+        self._bytes = 0
+        self._sweeper = None
+        self._stats = {"sets": 0, "gets": 0, "misses": 0, "expired": 0, "evicted": 0, "waits": 0}
+
+    def _start_sweeper(self):
+        # Called with the lock held
+        if self._sweeper is None:
+            self._sweeper = threading.Thread(target=self._sweep_forever, name='status-sweeper', daemon=True)
+            self._sweeper.start()
+
+    def _remove(self, task_id):
+        _, version, serialized = self._entries.pop(task_id)
+        self._bytes -= len(serialized)
+        return version
+
+    def _live_entry(self, task_id):
+        # Called with the lock held
+        entry = self._entries.get(task_id)
+        if entry is not None and entry[0] <= time.time():
+            self._remove(task_id)
+            self._stats["expired"] += 1
+            return None
+        return entry
+
+    def set(self, task_id, status):
+        serialized = _serialize(status)
+        with self._lock:
+            self._start_sweeper()
+            version = self._remove(task_id) + 1 if task_id in self._entries else 1
+            self._entries[task_id] = (time.time() + _ttl(status), version, serialized)
+            self._bytes += len(serialized)
+            self._stats["sets"] += 1
+            self._lock.notify_all()
+            # Least recently used first; the entry just written is never evicted
+            while self._bytes > self.max_bytes and len(self._entries) > 1:
+                evicted_id = next(iter(self._entries))
+                self._remove(evicted_id)
+                self._stats["evicted"] += 1
+                logger.warning(f"Evicted status of task {evicted_id} to stay within the status store budget")
+
+    def get(self, task_id):
+        with self._lock:
+            self._stats["gets"] += 1
+            entry = self._live_entry(task_id)
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(task_id)
+        return _deserialize(entry[2], entry[1])
+
+    def wait(self, task_id, since_version=0, timeout=30):
+        """
+        Block until the task's version exceeds since_version or timeout seconds pass
+        Returns the current status (check its version to tell the two apart), or None if unknown
+        """
+        deadline = time.monotonic() + timeout
+        with self._lock:
+            self._stats["waits"] += 1
+            while True:
+                entry = self._live_entry(task_id)
+                if entry is None:
+                    return None
+                remaining = deadline - time.monotonic()
+                if entry[1] > since_version or remaining <= 0:
+                    self._entries.move_to_end(task_id)
+                    return _deserialize(entry[2], entry[1])
+                self._lock.wait(remaining)
+
+    def sweep(self):
+        """
+        Drop every expired entry; returns how many were removed
+        """
+        now = time.time()
+        with self._lock:
+            expired = [task_id for task_id, (expires_at, _, _) in self._entries.items() if expires_at <= now]
+            for task_id in expired:
+                self._remove(task_id)
+            self._stats["expired"] += len(expired)
+        if expired:
+            logger.debug(f"Swept {len(expired)} expired task statuses")
+        return len(expired)
+
+    def _sweep_forever(self):
+        while True:
+            time.sleep(self.sweep_interval)
+            try:
+                self.sweep()
+            except Exception as e:
+                logger.error(f"Status sweep failed: {str(e)}")
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+            stats["bytes"] = self._bytes
+            stats["max_bytes"] = self.max_bytes
+            stats["largest_entry_bytes"] = max((len(serialized) for _, _, serialized in self._entries.values()), default=0)
+        stats["backend"] = "memory"
+        return stats
+
+
+class SQLiteStatusStore:
+    """
+    Task statuses in a SQLite database in WAL mode, shared by every worker process.
+
+    Any gunicorn worker can answer a status request for a task running in another.
+    WAL with synchronous=NORMAL keeps the frequent progress writes to an append
+    without an fsync per update. TTLs match the in-memory store; the byte budget is
+    enforced by the sweeper, dropping the least recently written entries first.
+    Waiters are woken at once by writes from this process and poll the version
+    column for writes from other processes.
+    """
+
+    def __init__(self, path=STATUS_DB_PATH, max_bytes=STATUS_STORE_MAX_MB * 1024 * 1024, sweep_interval=STATUS_SWEEP_INTERVAL):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.sweep_interval = sweep_interval
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._changed = threading.Condition()
+        self._sweeper = None
+        self._stats = {"sets": 0, "gets": 0, "misses": 0, "expired": 0, "evicted": 0, "errors": 0, "waits": 0}
+
+    def _connection(self):
+        # One connection per thread; sqlite3 connections must not be shared without locking
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS task_status ("
+                "task_id TEXT PRIMARY KEY, status BLOB NOT NULL, size INTEGER NOT NULL, "
+                "updated_at REAL NOT NULL, expires_at REAL NOT NULL, version INTEGER NOT NULL DEFAULT 1)"
+            )
+            columns = {row[1] for row in connection.execute("PRAGMA table_info(task_status)")}
+            if "version" not in columns:
+                connection.execute("ALTER TABLE task_status ADD COLUMN version INTEGER NOT NULL DEFAULT 1")
+            connection.execute("CREATE INDEX IF NOT EXISTS task_status_updated ON task_status (updated_at)")
+            self._local.connection = connection
+        return connection
+
+    def _increment(self, key, amount=1):
+        with self._lock:
+            self._stats[key] += amount
+
+    def _start_sweeper(self):
+        with self._lock:
+            if self._sweeper is None:
+                self._sweeper = threading.Thread(target=self._sweep_forever, name='status-sweeper', daemon=True)
+                self._sweeper.start()
+
+    def set(self, task_id, status):
+        serialized = _serialize(status)
+        now = time.time()
+        self._start_sweeper()
+        try:
+            self._connection().execute(
+                "INSERT INTO task_status (task_id, status, size, updated_at, expires_at) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (task_id) DO UPDATE SET status = excluded.status, size = excluded.size, "
+                "updated_at = excluded.updated_at, expires_at = excluded.expires_at, version = version + 1",
+                (task_id, serialized, len(serialized), now, now + _ttl(status))
+            )
+            self._increment("sets")
+        except sqlite3.Error as e:
+            self._increment("errors")
+            logger.error(f"Failed to store status of task {task_id}: {str(e)}")
+        with self._changed:
+            self._changed.notify_all()
+
+    def get(self, task_id):
+        self._increment("gets")
+        try:
+            row = self._connection().execute(
+                "SELECT status, version FROM task_status WHERE task_id = ? AND expires_at > ?",
+                (task_id, time.time())
+            ).fetchone()
+        except sqlite3.Error as e:
+            self._increment("errors")
+            logger.error(f"Failed to read status of task {task_id}: {str(e)}")
+            row = None
+        if row is None:
+            self._increment("misses")
+            return None
+        return _deserialize(*row)
+
+    def _version(self, task_id):
+        try:
+            row = self._connection().execute(
+                "SELECT version FROM task_status WHERE task_id = ? AND expires_at > ?",
+                (task_id, time.time())
+            ).fetchone()
+        except sqlite3.Error as e:
+            self._increment("errors")
+            logger.error(f"Failed to read version of task {task_id}: {str(e)}")
+            return None
+        return row[0] if row else None
+
+    def wait(self, task_id, since_version=0, timeout=30):
+        """
+        Block until the task's version exceeds since_version or timeout seconds pass
+        Returns the current status (check its version to tell the two apart), or None if unknown
+        """
+        self._increment("waits")
+        deadline = time.monotonic() + timeout
+        while True:
+            version = self._version(task_id)
+            if version is None:
+                return None
+            remaining = deadline - time.monotonic()
+            if version > since_version or remaining <= 0:
+                return self.get(task_id)
+            with self._changed:
+                self._changed.wait(min(STATUS_POLL_INTERVAL, remaining))
+
+    def sweep(self):
+        """
+        Drop expired entries, then the oldest entries beyond the byte budget; returns how many were removed
+        """
+        connection = self._connection()
+        expired = connection.execute("DELETE FROM task_status WHERE expires_at <= ?", (time.time(),)).rowcount
+        self._increment("expired", expired)
+        total = connection.execute("SELECT COALESCE(SUM(size), 0) FROM task_status").fetchone()[0]
+        evicted = 0
+        if total > self.max_bytes:
+            for task_id, size in connection.execute(
+                "SELECT task_id, size FROM task_status ORDER BY updated_at"
+            ).fetchall():
+                if total <= self.max_bytes:
+                    break
+                connection.execute("DELETE FROM task_status WHERE task_id = ?", (task_id,))
+                total -= size
+                evicted += 1
+            self._increment("evicted", evicted)
+            logger.warning(f"Evicted {evicted} task statuses to stay within the status store budget")
+        if expired:
+            logger.debug(f"Swept {expired} expired task statuses")
+        return expired + evicted
+
+    def _sweep_forever(self):
+        while True:
+            time.sleep(self.sweep_interval)
+            try:
+                self.sweep()
+            except Exception as e:
+                logger.error(f"Status sweep failed: {str(e)}")
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        try:
+            entries, total, largest = self._connection().execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(MAX(size), 0) FROM task_status"
+            ).fetchone()
+            stats.update({"entries": entries, "bytes": total, "largest_entry_bytes": largest})
+        except sqlite3.Error as e:
+            logger.error(f"Failed to read status store size: {str(e)}")
+        stats["max_bytes"] = self.max_bytes
+        stats["backend"] = "sqlite"
+        return stats
+
+
+STATUS_BACKENDS = {
+    "memory": MemoryStatusStore,
+    "sqlite": SQLiteStatusStore,
+}
+
+status_store = STATUS_BACKENDS[STATUS_BACKEND]()
+
+# Tasks whose statuses are copied to other tasks (coalesced duplicate requests)
+_mirrors = {}  # task_id -> [mirror task ids]
+_mirror_lock = threading.Lock()
 
-status_store = {}
-status_lock = Lock()
 
 def set_status(task_id, status):
-    with status_lock:
-        status_store[task_id] = status
+    # Under the lock so a mirror added mid-update cannot be left with an older status
+    with _mirror_lock:
+        status_store.set(task_id, status)
+        for mirror_id in _mirrors.get(task_id, ()):
+            status_store.set(mirror_id, status)
+
+def add_status_mirror(task_id, mirror_id):
+    """
+    Copy every later status of task_id to mirror_id, starting with the current one
+    """
+    with _mirror_lock:
+        _mirrors.setdefault(task_id, []).append(mirror_id)
+        status = status_store.get(task_id)
+        if status is not None:
+            status.pop("version", None)
+            status_store.set(mirror_id, status)
+
+def remove_status_mirrors(task_id):
+    with _mirror_lock:
+        return _mirrors.pop(task_id, [])
 
 def get_status(task_id):
-    with status_lock:
-        return status_store.get(task_id, None) 
\ No newline at end of file
+    return status_store.get(task_id)
+
+def wait_for_status(task_id, since_version=0, timeout=30):
+    return status_store.wait(task_id, since_version, timeout)
+
+def get_status_store_stats():
+    return status_store.stats()
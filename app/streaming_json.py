@@ -0,0 +1,101 @@
+import json
+
+import json_repair
+
+from app.logger import setup_logger
+
+# Initialize logger
+logger = setup_logger('streaming_json')
+
+
+def _parse_fragment(text):
+    # strict=False accepts the raw newlines models put inside strings
+    try:
+        return json.loads(text, strict=False)
+    except ValueError:
+        return json_repair.loads(text)
+
+
+class StreamingJSONObject:
+    """
+    Incremental parser for the top-level JSON object in streamed model output.
+
+    Text is fed as it arrives; each top-level field is returned as soon as its value
+    is complete. Anything before the opening brace (prose, markdown fences) is
+    skipped. Nested objects and arrays are only returned once whole. The buffer is
+    scanned once, so the total cost stays linear in the output length.
+    """
+
+    def __init__(self):
+        self._buffer = ''
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._key_start = None
+        self._key = None
+        self._value_start = None
+        self.done = False
+
+    def _finish_value(self, end):
+        raw = self._buffer[self._value_start:end].strip()
+        key, self._key, self._value_start = self._key, None, None
+        if key is None or not raw:
+            return None
+        try:
+            return key, _parse_fragment(raw)
+        except Exception as e:
+            logger.debug(f"Skipping unparseable streamed field {key}: {str(e)}")
+            return None
+
+    def feed(self, text):
+        """
+        Add streamed text; returns the (key, value) pairs completed by it
+        """
+        completed = []
+        if self.done:
+            return completed
+        self._buffer += text
+        buffer = self._buffer
+        for i in range(self._pos, len(buffer)):
+            ch = buffer[i]
+            if self._depth == 0:
+                if ch == '{':
+                    self._depth = 1
+                continue
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif ch == '\\':
+                    self._escaped = True
+                elif ch == '"':
+                    self._in_string = False
+                    if self._key_start is not None:
+                        self._key = _parse_fragment(buffer[self._key_start:i + 1])
+                        self._key_start = None
+                continue
+            if ch == '"':
+                self._in_string = True
+                if self._depth == 1 and self._key is None:
+                    self._key_start = i
+            elif ch in '{[':
+                self._depth += 1
+            elif ch in '}]':
+                self._depth -= 1
+                if self._depth == 0:
+                    if self._value_start is not None:
+                        field = self._finish_value(i)
+                        if field:
+                            completed.append(field)
+                    self.done = True
+                    self._pos = i + 1
+                    return completed
+            elif self._depth == 1:
+                if ch == ':' and self._key is not None and self._value_start is None:
+                    self._value_start = i + 1
+                elif ch == ',' and self._value_start is not None:
+                    field = self._finish_value(i)
+                    if field:
+                        completed.append(field)
+        self._pos = len(buffer)
+        return completed
@@ -0,0 +1,131 @@
+import re
+
+from app.logger import setup_logger
+
+# Initialize logger
+logger = setup_logger('token_budget')
+
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding("o200k_base")
+except Exception:
+    # Optional dependency; fall back to the script-aware heuristic below
+    _encoding = None
+
+# Constants
+CHARS_PER_TOKEN = 4  # Typical for English and other Latin-script text
+CJK_PATTERN = re.compile(r'[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uff66-\uff9f]')
+PAGE_OVERHEAD_TOKENS = 20  # URL, title and separator lines added by build_combined_content
+SENTENCE_END_PATTERN = re.compile(r'[.!?。！？](?=\s|$)|[。！？]')
+
+
+def estimate_tokens(text):
+    """
+    Estimate the number of model tokens in text
+    Uses tiktoken when installed; otherwise counts CJK characters as one token each
+    (character counts badly underestimate Japanese) and other text at ~4 characters per token.
+    """
+    if not text:
+        return 0
+    if _encoding is not None:
+        return len(_encoding.encode(text, disallowed_special=()))
+    cjk_chars = len(CJK_PATTERN.findall(text))
+    return cjk_chars + -(-(len(text) - cjk_chars) // CHARS_PER_TOKEN)
+
+
+def allocate_fair_shares(needs, budget):
+    """
+    Max-min fair allocation: pages needing less than an equal share keep everything,
+    and what they leave is split among the larger pages
+    """
+    allocations = [0] * len(needs)
+    remaining = budget
+    order = sorted(range(len(needs)), key=lambda index: needs[index])
+    for position, index in enumerate(order):
+        share = remaining // (len(needs) - position)
+        allocations[index] = min(needs[index], share)
+        remaining -= allocations[index]
+    return allocations
+
+
+def _trim_line(line, max_tokens):
+    """
+    Cut a line at the last sentence boundary that fits, or at a word boundary
+    """
+    if max_tokens <= 0:
+        return ''
+    # Binary search the longest prefix within the token limit
+    low, high = 0, len(line)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if estimate_tokens(line[:middle]) <= max_tokens:
+            low = middle
+        else:
+            high = middle - 1
+    prefix = line[:low]
+    sentence_ends = [match.end() for match in SENTENCE_END_PATTERN.finditer(prefix)]
+    if sentence_ends:
+        return prefix[:sentence_ends[-1]]
+    space = prefix.rfind(' ')
+    if space > 0 and max_tokens > 5:
+        return prefix[:space] + "..."
+    return ''
+
+
+def trim_to_tokens(text, max_tokens):
+    """
+    Trim content to max_tokens, keeping whole lines and ending partial lines at a sentence boundary
+    """
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    kept_lines = []
+    used = 0
+    for line in text.split('\n'):
+        line_tokens = estimate_tokens(line) + 1  # +1 for the newline
+        if used + line_tokens <= max_tokens:
+            kept_lines.append(line)
+            used += line_tokens
+            continue
+        partial = _trim_line(line, max_tokens - used - 1)
+        if partial:
+            kept_lines.append(partial)
+        break
+    return '\n'.join(kept_lines)
+
+
+def apply_token_budget(pages, max_tokens):
+    """
+    Fit the scraped pages into max_tokens with a fair share per page
+    Trims page content in place and returns a usage report
+    """
+    costs = [
+        estimate_tokens(page['content']) + estimate_tokens(page['description']) + PAGE_OVERHEAD_TOKENS
+        for page in pages
+    ]
+    allocations = allocate_fair_shares(costs, max_tokens)
+
+    used_tokens = 0
+    pages_trimmed = 0
+    for page, cost, allocation in zip(pages, costs, allocations):
+        if allocation < cost:
+            pages_trimmed += 1
+            description_tokens = estimate_tokens(page['description'])
+            content_allowance = allocation - PAGE_OVERHEAD_TOKENS - description_tokens
+            if content_allowance < 0:
+                page['description'] = trim_to_tokens(page['description'], max(allocation - PAGE_OVERHEAD_TOKENS, 0) // 2)
+                content_allowance = allocation - PAGE_OVERHEAD_TOKENS - estimate_tokens(page['description'])
+            page['content'] = trim_to_tokens(page['content'], max(content_allowance, 0))
+            logger.debug(f"Trimmed {page['url']} from {cost} to a {allocation} token share")
+        used_tokens += (
+            estimate_tokens(page['content']) + estimate_tokens(page['description']) + PAGE_OVERHEAD_TOKENS
+        )
+
+    return {
+        "max_tokens": max_tokens,
+        "used_tokens": used_tokens,
+        "available_tokens": max(max_tokens - used_tokens, 0),
+        "requested_tokens": sum(costs),
+        "pages": len(pages),
+        "pages_trimmed": pages_trimmed,
+        "estimator": "tiktoken" if _encoding is not None else "heuristic",
+    }
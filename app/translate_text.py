@@ -1,69 +1,153 @@
 import os
-import json
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from google.cloud import translate_v2 as translate
-from langdetect import detect, LangDetectException
+
+from app.logger import setup_logger
+from app.language_id import detect_language
+from app.translation_memory import translation_memory
+
+# Initialize logger
+logger = setup_logger('translate_text')
+
+# Constants
+CHUNK_SIZE = 30000  # Google API supports up to 30,000 characters per request
+TRANSLATE_BATCH_MAX_SEGMENTS = int(os.getenv("TRANSLATE_BATCH_MAX_SEGMENTS", "128"))  # API limit per request
+TRANSLATE_BATCH_MAX_CHARS = int(os.getenv("TRANSLATE_BATCH_MAX_CHARS", "25000"))
+TRANSLATE_CONCURRENCY = int(os.getenv("TRANSLATE_CONCURRENCY", "4"))
+UNTRANSLATABLE_PATTERN = re.compile(r'^(?:[\W\d_]+|https?://\S+|\S+@\S+\.\S+)$')
+
+_client = None
+_client_lock = threading.Lock()
 
 
 def get_translate_client():
-    return translate.Client()
+    """Return the shared translate client, created on first use."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = translate.Client()
+        return _client
 
 def is_english(text):
     """Detect if text is in English (or at least, not Japanese)."""
-    try:
-        lang = detect(text)
-        return lang == 'en'
-    except LangDetectException:
-        # For numbers, short strings, etc.
-        return False
+    return detect_language(text) == 'en'
 
 def translate_large_text_if_japanese(text, target_lang='en'):
-    # Check the language first!
-    translate_client = get_translate_client()
-    lang = detect(text)
-    print(f"Detected language: {lang}")
-    if lang == 'en':
-        print("Content is already english, returning original.")
-        return text 
-    # return text
+    # Check the language first! The client is only created if a chunk needs translating
+    lang = detect_language(text)
+    logger.info(f"Detected language: {lang}")
+    if lang is None or lang == target_lang:
+        logger.info(f"Content is already {target_lang} or has no text, returning original.")
+        return text
     # Now translate
-    CHUNK_SIZE = 30000
-    translated_chunks = []
-    for start in range(0, len(text), CHUNK_SIZE):
-        chunk = text[start:start+CHUNK_SIZE]
-        result = translate_client.translate(chunk, target_language=target_lang, source_language=lang)
-        translated_chunks.append(result['translatedText'])
-    return ''.join(translated_chunks)
+    return _translate_chunks(text, lang, target_lang)
 
 def translate_large_text(text, source_language='en', target_lang='ja'):
-    # Google API supports up to 30,000 characters per request
-    translate_client = get_translate_client()
-    CHUNK_SIZE = 30000
+    return _translate_chunks(text, source_language, target_lang)
+
+def _translate_chunks(text, source, target):
+    """Translate text in API-sized chunks, reusing remembered chunk translations."""
+    chunks = [text[start:start+CHUNK_SIZE] for start in range(0, len(text), CHUNK_SIZE)]
+    remembered = translation_memory.get_many(chunks, source, target)
     translated_chunks = []
-    for start in range(0, len(text), CHUNK_SIZE):
-        chunk = text[start:start+CHUNK_SIZE]
-        result = translate_client.translate(chunk, target_language=target_lang, source_language=source_language)
-        translated_chunks.append(result['translatedText'])
+    for chunk in chunks:
+        if chunk not in remembered:
+            result = get_translate_client().translate(chunk, target_language=target, source_language=source)
+            remembered[chunk] = result['translatedText']
+            translation_memory.set(chunk, remembered[chunk], source, target)
+        translated_chunks.append(remembered[chunk])
     return ''.join(translated_chunks)
 
 
 def translate_text(text, target='ja'):
     """Translate a string to the target language (Japanese)."""
-    translate_client = get_translate_client()
-    # Safety: Only translate if text is detected as English
     if not text or not isinstance(text, str):
         return text
-    result = translate_client.translate(text, target_language=target)
-    return result['translatedText']
+    return translate_strings([text], target=target)[text]
 
 
-def translate_data_to_japanese(data):
-    """Recursively traverse and translate all English strings to Japanese."""
+def _needs_translation(text):
+    return bool(text.strip()) and not UNTRANSLATABLE_PATTERN.match(text.strip())
+
+def _make_batches(strings):
+    """Split strings into requests bounded by segment count and total characters."""
+    batches = []
+    current = []
+    current_chars = 0
+    for text in strings:
+        if current and (
+            len(current) >= TRANSLATE_BATCH_MAX_SEGMENTS
+            or current_chars + len(text) > TRANSLATE_BATCH_MAX_CHARS
+        ):
+            batches.append(current)
+            current = []
+            current_chars = 0
+        current.append(text)
+        current_chars += len(text)
+    if current:
+        batches.append(current)
+    return batches
+
+def _translate_batch(batch, target, source=None):
+    results = get_translate_client().translate(batch, target_language=target, source_language=source)
+    return [result['translatedText'] for result in results]
+
+def translate_strings(strings, target='ja', source=None):
+    """
+    Translate many strings with as few API calls as possible.
+    Duplicates are sent once and remembered translations are not sent at all;
+    returns a dict mapping each original string to its translation.
+    """
+    unique = list(dict.fromkeys(text for text in strings if isinstance(text, str)))
+    translations = {text: text for text in unique}
+    pending = [text for text in unique if _needs_translation(text)]
+    remembered = translation_memory.get_many(pending, source, target)
+    translations.update(remembered)
+    pending = [text for text in pending if text not in remembered]
+    if not pending:
+        return translations
+
+    batches = _make_batches(pending)
+    logger.info(f"Translating {len(pending)} unique strings in {len(batches)} request(s)")
+    if len(batches) == 1:
+        batch_results = [_translate_batch(batches[0], target, source)]
+    else:
+        with ThreadPoolExecutor(max_workers=min(TRANSLATE_CONCURRENCY, len(batches))) as executor:
+            batch_results = list(executor.map(lambda batch: _translate_batch(batch, target, source), batches))
+
+    fresh = {}
+    for batch, translated in zip(batches, batch_results):
+        fresh.update(zip(batch, translated))
+    translation_memory.set_many(fresh, source, target)
+    translations.update(fresh)
+    return translations
+
+
+def _collect_strings(data, strings):
     if isinstance(data, dict):
-        return {k: translate_data_to_japanese(v) for k, v in data.items()}
+        for value in data.values():
+            _collect_strings(value, strings)
     elif isinstance(data, list):
-        return [translate_data_to_japanese(item) for item in data]
+        for item in data:
+            _collect_strings(item, strings)
     elif isinstance(data, str):
-        return translate_text(data, target='ja')
+        strings.append(data)
+
+def _apply_translations(data, translations):
+    if isinstance(data, dict):
+        return {k: _apply_translations(v, translations) for k, v in data.items()}
+    elif isinstance(data, list):
+        return [_apply_translations(item, translations) for item in data]
+    elif isinstance(data, str):
+        return translations.get(data, data)
     else:
         # int, float, bool, None, etc.
-        return data
\ No newline at end of file
+        return data
+
+def translate_data_to_japanese(data):
+    """Translate every string in a parsed result to Japanese, batching the API calls."""
+    strings = []
+    _collect_strings(data, strings)
+    return _apply_translations(data, translate_strings(strings, target='ja'))
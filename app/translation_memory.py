@@ -0,0 +1,204 @@
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+
+from app.logger import setup_logger
+
+# Initialize logger
+logger = setup_logger('translation_memory')
+
+# Constants
+TRANSLATION_MEMORY_PATH = os.getenv("TRANSLATION_MEMORY_PATH", os.path.join('cache', 'translation_memory.sqlite3'))
+TRANSLATION_MEMORY_TTL = int(os.getenv("TRANSLATION_MEMORY_TTL", str(30 * 24 * 60 * 60)))  # Seconds a translation is reused
+TRANSLATION_MEMORY_ENTRIES = int(os.getenv("TRANSLATION_MEMORY_ENTRIES", "20000"))  # In-memory LRU size
+TRANSLATION_MEMORY_MAX_MB = int(os.getenv("TRANSLATION_MEMORY_MAX_MB", "32"))  # In-memory LRU budget; page chunks can be 30k characters each
+TRANSLATION_MEMORY_DISK_MAX_MB = int(os.getenv("TRANSLATION_MEMORY_DISK_MAX_MB", "512"))  # SQLite budget, oldest entries go first
+TRANSLATION_MEMORY_PRUNE_INTERVAL = int(os.getenv("TRANSLATION_MEMORY_PRUNE_INTERVAL", str(60 * 60)))  # Seconds between SQLite prunes
+TRANSLATION_MEMORY_ENABLED = os.getenv("TRANSLATION_MEMORY_ENABLED", "true").lower() not in {'0', 'false', 'no', 'off'}
+SQLITE_MAX_VARIABLES = 500
+
+
+def make_translation_key(text, source, target):
+    """
+    Key for a translation: hash of the source text plus the language pair
+    """
+    material = f"{source or 'auto'}\x00{target}\x00{text}"
+    return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+
+class TranslationMemory:
+    """
+    Two-tier translation memory: an in-memory LRU in front of a SQLite table.
+
+    Page chunks and result strings share it, so recurring labels, boilerplate and
+    re-analysed pages are translated once. SQLite keeps the many small entries in a
+    single file instead of one file per string. The LRU is bounded by entries and by
+    bytes; the table is pruned of expired rows and trimmed to its byte budget at most
+    once per prune interval.
+    """
+
+    def __init__(
+        self,
+        path=TRANSLATION_MEMORY_PATH,
+        ttl=TRANSLATION_MEMORY_TTL,
+        memory_entries=TRANSLATION_MEMORY_ENTRIES,
+        memory_max_bytes=TRANSLATION_MEMORY_MAX_MB * 1024 * 1024,
+        disk_max_bytes=TRANSLATION_MEMORY_DISK_MAX_MB * 1024 * 1024,
+        prune_interval=TRANSLATION_MEMORY_PRUNE_INTERVAL,
+        enabled=TRANSLATION_MEMORY_ENABLED,
+    ):
+        self.path = path
+        self.ttl = ttl
+        self.memory_entries = memory_entries
+        self.memory_max_bytes = memory_max_bytes
+        self.disk_max_bytes = disk_max_bytes
+        self.prune_interval = prune_interval
+        self.enabled = enabled
+        self._memory = OrderedDict()  # key -> translated text
+        self._memory_bytes = 0
+        self._last_prune = 0
+        self._lock = threading.Lock()
+        self._db = None
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0, "characters_saved": 0, "disk_evicted": 0}
+
+    def _connect(self):
+        # Called with the lock held; one connection shared across threads
+        if self._db is None:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS translations "
+                "(key TEXT PRIMARY KEY, translated TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS translations_expires ON translations (expires_at)")
+            self._db.commit()
+        return self._db
+
+    def _prune(self, db):
+        """
+        Called with the lock held: drop expired rows, then the oldest rows beyond the byte budget
+        """
+        now = time.time()
+        if now - self._last_prune < self.prune_interval:
+            return
+        self._last_prune = now
+        db.execute("DELETE FROM translations WHERE expires_at <= ?", (now,))
+        total = db.execute("SELECT COALESCE(SUM(LENGTH(CAST(translated AS BLOB))), 0) FROM translations").fetchone()[0]
+        evicted = []
+        if total > self.disk_max_bytes:
+            # All rows share one TTL, so the earliest expiry is the oldest write
+            for key, size in db.execute(
+                "SELECT key, LENGTH(CAST(translated AS BLOB)) FROM translations ORDER BY expires_at"
+            ).fetchall():
+                if total <= self.disk_max_bytes:
+                    break
+                evicted.append(key)
+                total -= size
+            for start in range(0, len(evicted), SQLITE_MAX_VARIABLES):
+                chunk = evicted[start:start + SQLITE_MAX_VARIABLES]
+                db.execute(f"DELETE FROM translations WHERE key IN ({','.join('?' * len(chunk))})", chunk)
+            self._stats["disk_evicted"] += len(evicted)
+            logger.info(f"Evicted {len(evicted)} translations to stay within the translation memory budget")
+        db.commit()
+
+    def _forget(self, key):
+        translated = self._memory.pop(key)
+        self._memory_bytes -= len(translated.encode('utf-8'))
+
+    def _remember(self, key, translated):
+        size = len(translated.encode('utf-8'))
+        if size > self.memory_max_bytes:
+            return  # Would evict everything else; served from SQLite instead
+        if key in self._memory:
+            self._forget(key)
+        self._memory[key] = translated
+        self._memory_bytes += size
+        while len(self._memory) > self.memory_entries or self._memory_bytes > self.memory_max_bytes:
+            self._forget(next(iter(self._memory)))
+
+    def get_many(self, texts, source, target):
+        """
+        Return a dict of the texts that have a remembered translation
+        """
+        if not self.enabled or not texts:
+            return {}
+        keys = {make_translation_key(text, source, target): text for text in texts}
+        found = {}
+        with self._lock:
+            missing = []
+            for key, text in keys.items():
+                if key in self._memory:
+                    self._memory.move_to_end(key)
+                    found[text] = self._memory[key]
+                    self._stats["memory_hits"] += 1
+                else:
+                    missing.append(key)
+
+            try:
+                db = self._connect()
+                for start in range(0, len(missing), SQLITE_MAX_VARIABLES):
+                    chunk = missing[start:start + SQLITE_MAX_VARIABLES]
+                    rows = db.execute(
+                        f"SELECT key, translated FROM translations "
+                        f"WHERE expires_at > ? AND key IN ({','.join('?' * len(chunk))})",
+                        [time.time(), *chunk]
+                    ).fetchall()
+                    for key, translated in rows:
+                        found[keys[key]] = translated
+                        self._remember(key, translated)
+                        self._stats["disk_hits"] += 1
+            except sqlite3.Error as e:
+                logger.warning(f"Translation memory lookup failed: {str(e)}")
+
+            self._stats["misses"] += len(keys) - len(found)
+            self._stats["characters_saved"] += sum(len(text) for text in found)
+        return found
+
+    def get(self, text, source, target):
+        return self.get_many([text], source, target).get(text)
+
+    def set_many(self, translations, source, target):
+        """
+        Remember a dict of source text -> translated text
+        """
+        if not self.enabled or not translations:
+            return
+        expires_at = time.time() + self.ttl
+        rows = [
+            (make_translation_key(text, source, target), translated, expires_at)
+            for text, translated in translations.items()
+        ]
+        with self._lock:
+            for key, translated, _ in rows:
+                self._remember(key, translated)
+            self._stats["stores"] += len(rows)
+            try:
+                db = self._connect()
+                db.executemany("INSERT OR REPLACE INTO translations VALUES (?, ?, ?)", rows)
+                db.commit()
+                self._prune(db)
+            except sqlite3.Error as e:
+                logger.warning(f"Failed to persist translations: {str(e)}")
+
+    def set(self, text, translated, source, target):
+        self.set_many({text: translated}, source, target)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["memory_entries"] = len(self._memory)
+            stats["memory_bytes"] = self._memory_bytes
+            stats["memory_max_bytes"] = self.memory_max_bytes
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = round((stats["memory_hits"] + stats["disk_hits"]) / lookups, 3) if lookups else 0.0
+        return stats
+
+
+translation_memory = TranslationMemory()
+
+
+def get_translation_memory_stats():
+    return translation_memory.stats()
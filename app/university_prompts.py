@@ -1,8 +1,13 @@
-from typing import Optional
+from typing import Dict, List, Optional
+
+from app.prompts import apply_response_language, build_prompt_messages
+
+# Bump whenever a prompt below changes so cached analysis results are not reused
+UNIVERSITY_PROMPT_VERSION = "2"
 
 
 GENERAL_PROMPT_TEMPLATE = """
-You are a higher-education research analyst. Review the scraped website text and return a JSON object that fills the schema below with grounded insights. Do not hallucinate. Use empty strings or empty arrays when you cannot find information.
+You are a higher-education research analyst. Review the scraped website text above and return a JSON object that fills the schema below with grounded insights. Do not hallucinate. Use empty strings or empty arrays when you cannot find information.
 
 {
     "type": "object",
@@ -65,24 +70,21 @@ Rules:
 - Resource links should list up to 5 useful URLs with descriptive labels pulled from the site.
 - If a value is not available, use "" or [] as appropriate.
 - Output JSON only (no markdown, no commentary).
-
----SCRAPED TEXT START---
-{{WEBSITE_SCRAPED_CONTENT}}
----SCRAPED TEXT END---
 """.strip()
 
 
-def get_university_general_prompt(scraped_content: str, domain: str) -> str:
-    """Build the prompt for shared university knowledge."""
-    return (
-        GENERAL_PROMPT_TEMPLATE
-        .replace("{{WEBSITE_SCRAPED_CONTENT}}", scraped_content)
-        .replace("${domain}", domain)
-    )
+def get_university_general_prompt(
+    scraped_content: str,
+    domain: str,
+    response_language: Optional[str] = None
+) -> List[Dict[str, str]]:
+    """Build the prompt messages for shared university knowledge."""
+    instructions = apply_response_language(GENERAL_PROMPT_TEMPLATE, response_language).replace("${domain}", domain)
+    return build_prompt_messages(instructions, scraped_content)
 
 
 RECRUITER_PROMPT = """
-You curate specialized insights for the Recruiter AI agent. Study the scraped text and populate the JSON schema below with grounded data. Do not add extra keys. Use empty strings or arrays when details are unavailable.
+You curate specialized insights for the Recruiter AI agent. Study the scraped text above and populate the JSON schema below with grounded data. Do not add extra keys. Use empty strings or arrays when details are unavailable.
 
 {
     "type": "object",
@@ -111,15 +113,11 @@ Rules:
 - Each array should list 3-5 concise bullet points summarizing the topic.
 - Use explicit term names, regions, or audiences whenever available.
 - Output JSON only (no markdown, no commentary).
-
----SCRAPED TEXT START---
-{{WEBSITE_SCRAPED_CONTENT}}
----SCRAPED TEXT END---
 """.strip()
 
 
 ADMISSIONS_PROMPT = """
-You curate specialized insights for the Admissions AI agent. Study the scraped text and populate the JSON schema below with grounded data. Do not add extra keys. Use empty strings or arrays when details are unavailable.
+You curate specialized insights for the Admissions AI agent. Study the scraped text above and populate the JSON schema below with grounded data. Do not add extra keys. Use empty strings or arrays when details are unavailable.
 
 {
     "type": "object",
@@ -147,15 +145,11 @@ Rules:
 - Use bullet-style strings for requirements and required documents.
 - Summaries should stay within two short paragraphs when a field is a string.
 - Output JSON only (no markdown, no commentary).
-
----SCRAPED TEXT START---
-{{WEBSITE_SCRAPED_CONTENT}}
----SCRAPED TEXT END---
 """.strip()
 
 
 FINANCIAL_AID_PROMPT = """
-You curate specialized insights for the Financial Aid AI agent. Study the scraped text and populate the JSON schema below with grounded data. Do not add extra keys. Use empty strings or arrays when details are unavailable.
+You curate specialized insights for the Financial Aid AI agent. Study the scraped text above and populate the JSON schema below with grounded data. Do not add extra keys. Use empty strings or arrays when details are unavailable.
 
 {
     "type": "object",
@@ -185,15 +179,11 @@ Rules:
 - For arrays, include 3-5 focused bullet points.
 - Keep string fields to two short paragraphs or fewer.
 - Output JSON only (no markdown, no commentary).
-
----SCRAPED TEXT START---
-{{WEBSITE_SCRAPED_CONTENT}}
----SCRAPED TEXT END---
 """.strip()
 
 
 ATHLETICS_PROMPT = """
-You curate specialized insights for the Athletics AI agent. Study the scraped text and populate the JSON schema below with grounded data. Do not add extra keys. Use empty strings or arrays when details are unavailable.
+You curate specialized insights for the Athletics AI agent. Study the scraped text above and populate the JSON schema below with grounded data. Do not add extra keys. Use empty strings or arrays when details are unavailable.
 
 {
     "type": "object",
@@ -220,15 +210,11 @@ Rules:
 - When possible, call out specific sports, facilities, or events.
 - Limit string fields to two concise paragraphs.
 - Output JSON only (no markdown, no commentary).
-
----SCRAPED TEXT START---
-{{WEBSITE_SCRAPED_CONTENT}}
----SCRAPED TEXT END---
 """.strip()
 
 
 CAMPUS_LIFE_PROMPT = """
-You curate specialized insights for the Campus Life AI agent. Study the scraped text and populate the JSON schema below with grounded data. Do not add extra keys. Use empty strings or arrays when details are unavailable.
+You curate specialized insights for the Campus Life AI agent. Study the scraped text above and populate the JSON schema below with grounded data. Do not add extra keys. Use empty strings or arrays when details are unavailable.
 
 {
     "type": "object",
@@ -257,10 +243,6 @@ Rules:
 - Arrays should list 3-5 notable items or groups.
 - Keep narrative fields within two short paragraphs.
 - Output JSON only (no markdown, no commentary).
-
----SCRAPED TEXT START---
-{{WEBSITE_SCRAPED_CONTENT}}
----SCRAPED TEXT END---
 """.strip()
 
 
@@ -308,11 +290,12 @@ def resolve_agent_key(agent_type: str) -> Optional[str]:
     return None
 
 
-def get_university_specialized_prompt(agent_key: str, scraped_content: str, domain: str) -> str:
-    """Build the prompt for a specific university agent."""
-    template = UNIVERSITY_AGENT_TYPES[agent_key]["prompt"]
-    return (
-        template
-        .replace("{{WEBSITE_SCRAPED_CONTENT}}", scraped_content)
-        .replace("${domain}", domain)
-    )
+def get_university_specialized_prompt(
+    agent_key: str,
+    scraped_content: str,
+    domain: str,
+    response_language: Optional[str] = None
+) -> List[Dict[str, str]]:
+    """Build the prompt messages for a specific university agent."""
+    instructions = apply_response_language(UNIVERSITY_AGENT_TYPES[agent_key]["prompt"], response_language).replace("${domain}", domain)
+    return build_prompt_messages(instructions, scraped_content)
@@ -1,28 +1,49 @@
 import os
 import json
+import time
 import asyncio
-import requests
-from pyppeteer import launch
-from bs4 import BeautifulSoup
+import threading
+import httpx
 from urllib.parse import urljoin, urlparse
-from openai import OpenAI
-from app.prompts import get_analysis_prompt, get_brand_intelligence_prompt, get_faq_prompt
-from fake_useragent import UserAgent
+from app.prompts import (
+    get_analysis_prompt,
+    get_brand_intelligence_prompt,
+    get_faq_prompt,
+    apply_response_language,
+    build_prompt_messages,
+    PROMPT_VERSION,
+)
 import random
-import time
 from app.logger import setup_logger, save_data_with_rotation
 import re
 from datetime import datetime
 import json_repair
 import nest_asyncio
-from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures import ThreadPoolExecutor
 from app.status_store import set_status
+from app.http_pool import http_pool, get_header_profile
+from app.render_pool import render_pool
+from app.page_cache import page_cache
+from app.discovery import discover_site
+from app.link_scoring import LinkScorer, Frontier
+from app.extraction import extract_page, is_access_block_page
+from app.boilerplate import BoilerplateFilter
+from app.token_budget import apply_token_budget, estimate_tokens
+from app.domain_strategy import domain_strategy, STRATEGY_STATIC, STRATEGY_RENDER, STRATEGY_BLOCKED
+from app.dedupe import canonicalize_url, url_identity, content_shingles, NearDuplicateDetector
 from app.translate_text import translate_large_text_if_japanese, translate_data_to_japanese
 from app.university_prompts import (
     get_university_general_prompt,
     get_university_specialized_prompt,
     UNIVERSITY_AGENT_TYPES,
+    UNIVERSITY_PROMPT_VERSION,
 )
+from app.result_cache import result_cache, make_result_key
+from app.job_queue import stage_limiter
+from app.llm_client import llm_client, LLM_STREAMING
+from app.streaming_json import StreamingJSONObject
+from app.partial_results import PartialResultPublisher
+from app.pipeline_metrics import pipeline_metrics, StageTimer, TRANSLATION_MODE_NATIVE, TRANSLATION_MODE_TRANSLATE
 
 # Initialize logger
 logger = setup_logger('utils')
@@ -31,86 +52,19 @@ logger = setup_logger('utils')
 nest_asyncio.apply()
 
 # Constants
-MAX_CONTENT_LENGTH = 80000  # Maximum content length in characters
-PYPPETEER_EXECUTOR = ProcessPoolExecutor(max_workers=1)  # Single worker for Pyppeteer
-BLOCK_PAGE_STRONG_PATTERNS = [
-    'vercel security checkpoint',
-    'enable javascript to continue',
-    'verify you are human',
-    'verify your browser',
-    'checking your browser',
-    'cf-browser-verification',
-    'challenge-platform',
-    'why have i been blocked',
-    'attention required!',
+MAX_CONTENT_TOKENS = int(os.getenv("MAX_CONTENT_TOKENS", "20000"))  # Scraped content budget shared by all pages
+MODEL_CONTEXT_TOKENS = 131072  # Context window of the default model
+CRAWL_CONCURRENCY = int(os.getenv("CRAWL_CONCURRENCY", "4"))  # Pages fetched at once per crawl
+CRAWL_PER_HOST_CONCURRENCY = int(os.getenv("CRAWL_PER_HOST_CONCURRENCY", "2"))  # Pages fetched at once per host
+CRAWL_JITTER_SECONDS = (0.05, 0.3)  # Small random delay before each request
+TRANSLATION_MODE = os.getenv("TRANSLATION_MODE", TRANSLATION_MODE_NATIVE)  # native or translate
+PREFIX_CACHE_WAIT_SECONDS = float(os.getenv("PREFIX_CACHE_WAIT_SECONDS", "10"))  # Longest the other calls of an analysis wait for the first to cache the shared prompt prefix
+DEFAULT_MODELS = [
+    "openai/gpt-oss-120b",
+    # "openai/gpt-oss-20b",
+    # "llama-3.3-70b-versatile",
+    # "llama-3.1-8b-instant",
 ]
-BLOCK_PAGE_MODERATE_PATTERNS = [
-    'security checkpoint',
-    'browser verification',
-    'browser check',
-    'access denied',
-    'request blocked',
-    'captcha',
-    'cloudflare',
-    'datadome',
-    'perimeterx',
-    'akamai',
-    'bot check',
-    'ddos protection',
-]
-
-def _fetch_with_pyppeteer_process(url):
-    """
-    Run Pyppeteer in a separate process
-    """
-    async def _fetch_html():
-        browser = None
-        try:
-            browser = await launch(
-                headless=True,
-                args=[
-                    '--no-sandbox',
-                    '--disable-setuid-sandbox',
-                    '--disable-dev-shm-usage',
-                    '--disable-accelerated-2d-canvas',
-                    '--disable-gpu'
-                ]
-            )
-            page = await browser.newPage()
-            await page.setViewport({'width': 1280, 'height': 800})
-            await page.goto(url, {'waitUntil': 'networkidle0', 'timeout': 30000})
-            content = await page.content()
-            return content
-        except Exception as e:
-            print(f"Error in Pyppeteer fetch: {str(e)}")  # Use print for process logging
-            return None
-        finally:
-            if browser:
-                try:
-                    await browser.close()
-                except:
-                    pass
-    try:
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        result = loop.run_until_complete(_fetch_html())
-        loop.close()
-        return result
-    except Exception as e:
-        print(f"Error in Pyppeteer process: {str(e)}")  # Use print for process logging
-        return None
-
-def run_pyppeteer(url):
-    """
-    Run Pyppeteer in a separate process
-    """
-    try:
-        # Run Pyppeteer in a separate process
-        future = PYPPETEER_EXECUTOR.submit(_fetch_with_pyppeteer_process, url)
-        return future.result(timeout=60)  # 60 second timeout
-    except Exception as e:
-        logger.error(f"Error running Pyppeteer: {str(e)}")
-        return None
 
 def sanitize_filename(url):
     """
@@ -126,43 +80,21 @@ def sanitize_filename(url):
 
 def get_openai_client():
     """
-    Initialize and return OpenAI client (configured for Groq)
+    Return the shared OpenAI client (configured for Groq)
     """
     try:
-        client = OpenAI(
-            base_url="https://api.groq.com/openai/v1",
-            api_key=os.getenv("GROQ_API_KEY"),
-        )
-        logger.debug("OpenAI client initialized successfully (Groq)")
-        return client
+        return llm_client.get_client()
     except Exception as e:
         logger.error(f"Failed to initialize OpenAI client: {str(e)}")
         raise
 
 def get_random_headers():
     """
-    Generate random headers for each request
+    Return the next header profile from the shared rotation
     """
-    try:
-        ua = UserAgent()
-        headers = {
-            'User-Agent': ua.random,
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-            'Accept-Language': 'en-US,en;q=0.5',
-            'Accept-Encoding': 'gzip, deflate, br',
-            'DNT': '1',
-            'Connection': 'keep-alive',
-            'Upgrade-Insecure-Requests': '1',
-            'Cache-Control': 'max-age=0',
-        }
-        logger.debug(f"Generated random headers with User-Agent: {headers['User-Agent']}")
-        return headers
-    except Exception as e:
-        logger.warning(f"Failed to generate random headers, using fallback: {str(e)}")
-        return {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-        }
+    headers = get_header_profile()
+    logger.debug(f"Using header profile with User-Agent: {headers['User-Agent']}")
+    return headers
 
 def is_valid_url(url):
     """
@@ -184,266 +116,339 @@ def is_valid_url(url):
         return False
 
 
-def is_access_block_page(title='', description='', content=''):
+def build_structured_data(url, title, description, content_parts, translate=True):
     """
-    Detect common anti-bot, CAPTCHA, and security interstitial pages.
+    Combine extracted content lines into the page record, translating if Japanese
+    In native generation mode the content is kept in its source language.
     """
-    normalized_text = ' '.join(filter(None, [title, description, content])).lower()
-    normalized_text = re.sub(r'\s+', ' ', normalized_text).strip()
+    content = '\n'.join(filter(None, content_parts))
+    if translate:
+        content = translate_large_text_if_japanese(content)
+    structured_data = {
+        "url": url,
+        "title": title or "",
+        "description": description or "",
+        "content": content
+    }
+    # Cache the verdict on the record so later stages do not rescan the text
+    structured_data["blocked"] = is_access_block_page(
+        structured_data["title"],
+        structured_data["description"],
+        content
+    )
+    logger.debug(f"Extracted structured content from {url}")
+    return structured_data
 
-    if not normalized_text:
-        return False
+def filter_same_domain_links(links, base_url):
+    """
+    Resolve links against base_url and keep those on the same domain
+    links holds hrefs or (href, anchor_text) pairs; returns a dict of absolute URL to anchor text
+    """
+    # Parse base URL and get domain without www
+    base_parsed = urlparse(base_url)
+    base_domain = base_parsed.netloc
+    if base_domain.startswith('www.'):
+        base_domain = base_domain[4:]
+        
+    same_domain_links = {}
+    
+    for link in links:
+        href, anchor_text = (link, '') if isinstance(link, str) else link
+        full_url = urljoin(base_url, href)
+        
+        # Parse the full URL and get domain without www
+        full_parsed = urlparse(full_url)
+        full_domain = full_parsed.netloc
+        if full_domain.startswith('www.'):
+            full_domain = full_domain[4:]
+        
+        if is_valid_url(full_url) and full_domain == base_domain:
+            if not same_domain_links.get(full_url):
+                same_domain_links[full_url] = anchor_text or ''
+    
+    logger.debug(f"Found {len(same_domain_links)} valid links on {base_url}")
+    return same_domain_links
 
-    if any(pattern in normalized_text for pattern in BLOCK_PAGE_STRONG_PATTERNS):
-        return True
+def run_coroutine(coro):
+    """
+    Run a coroutine to completion on a fresh event loop owned by the calling thread
+    """
+    loop = asyncio.new_event_loop()
+    try:
+        asyncio.set_event_loop(loop)
+        return loop.run_until_complete(coro)
+    finally:
+        try:
+            loop.run_until_complete(loop.shutdown_default_executor())
+        finally:
+            asyncio.set_event_loop(None)
+            loop.close()
 
-    moderate_match_count = sum(
-        1 for pattern in BLOCK_PAGE_MODERATE_PATTERNS
-        if pattern in normalized_text
-    )
-    if moderate_match_count >= 2:
-        return True
-
-    content_lines = [line.strip().lower() for line in content.splitlines() if line.strip()]
-    if (
-        len(content_lines) <= 10
-        and any('javascript' in line for line in content_lines)
-        and any(
-            keyword in line
-            for line in content_lines
-            for keyword in ['security', 'checkpoint', 'browser', 'verification']
-        )
-    ):
-        return True
+async def _wait_for_crawl_delay(host, crawl_delay, host_schedule):
+    """
+    Space requests to a host at least crawl_delay seconds apart
+    """
+    if not crawl_delay or host_schedule is None:
+        return
+    now = asyncio.get_running_loop().time()
+    # Reserve the next slot before sleeping so concurrent fetches queue up behind each other
+    start_at = max(host_schedule.get(host, now), now)
+    host_schedule[host] = start_at + crawl_delay
+    if start_at > now:
+        logger.debug(f"Honouring crawl-delay for {host}, waiting {start_at - now:.2f} seconds")
+        await asyncio.sleep(start_at - now)
 
-    return False
+def _host_limit(host_limits, host):
+    return host_limits.setdefault(host, asyncio.Semaphore(CRAWL_PER_HOST_CONCURRENCY))
 
-def extract_structured_content(soup, url):
+async def _fetch_static(current_url, global_limit, host_limits, crawl_delay=None, host_schedule=None):
     """
-    Extract structured content from the page and translate if Japanese
+    Fetch a page with a plain HTTP request (or the page cache) and parse it
+    Returns the extract_page record or None if the request failed
     """
-    try:
-        # Initialize content structure
-        content_parts = []
-        # Extract title
-        title = soup.title.string if soup.title else ""
-        # Extract meta description
-        meta_desc = soup.find('meta', attrs={'name': 'description'})
-        description = meta_desc['content'] if meta_desc else ""
-        # Extract main content in sequence
-        for element in soup.find_all(['h1', 'h2', 'h3', 'p', 'ul', 'ol', 'li', 'span']):
-            if element.name in ['ul', 'ol']:
-                # Skip the list container itself, we'll get its items
-                continue
-            # Get text content
-            text = element.get_text(strip=True)
-            if text:
-                # Add element type as prefix for better context
-                element_type = element.name.upper()
-                content_parts.append(f"{element_type}: {text}")
-        # Combine all content with newlines
-        content = translate_large_text_if_japanese('\n'.join(filter(None, content_parts)))  
-        # Create structured data
-        structured_data = {
-            "url": url,
-            "title": title,
-            "description": description,
-            "content": content
-        }
-        logger.debug(f"Extracted structured content from {url}")
-        return structured_data
-        
-    except Exception as e:
-        logger.error(f"Error extracting structured content from {url}: {str(e)}")
-        raise
+    host = urlparse(current_url).netloc
+    host_limit = _host_limit(host_limits, host)
+    body = None
+    fresh_response = None
+
+    cached = page_cache.lookup(current_url)
+    if page_cache.is_fresh(cached):
+        logger.info(f"Using cached copy of {current_url}")
+        page_cache.record_hit()
+        body = cached["body"]
+    else:
+        async with global_limit, host_limit:
+            logger.info(f"Scraping URL: {current_url}")
+            await _wait_for_crawl_delay(host, crawl_delay, host_schedule)
+            await asyncio.sleep(random.uniform(*CRAWL_JITTER_SECONDS))
+            try:
+                headers = get_random_headers()
+                headers.update(page_cache.conditional_headers(cached))
+                response = await http_pool.get(current_url, headers=headers)
+                if response.status_code == 304 and cached:
+                    logger.info(f"Cached copy of {current_url} is still valid")
+                    body = page_cache.revalidated(current_url, cached, response)["body"]
+                else:
+                    response.raise_for_status()
+                    body = response.text
+                    fresh_response = response
+            except httpx.HTTPError as e:
+                logger.warning(f"Regular request failed for {current_url}: {str(e)}")
 
-def get_links(soup, base_url):
+    if body is None:
+        return None
+    # Parse once for content, links and the sufficiency verdict; parsing is CPU bound
+    page = await asyncio.to_thread(extract_page, body)
+    # Bot walls are not cached, or they would outlive the blocked-domain TTL
+    if fresh_response is not None and not page['blocked']:
+        page_cache.store_response(current_url, fresh_response, stale_entry=cached)
+    return page
+
+async def _fetch_rendered(current_url, host_limits, crawl_delay=None, host_schedule=None):
     """
-    Extract all links from the page that belong to the same domain
+    Render a page in the browser pool (or reuse a cached render)
+    Renders share the per-host limit and crawl-delay schedule with plain fetches.
+    Returns the render payload with its block-page verdict, or None if rendering failed
     """
-    try:
-        # Parse base URL and get domain without www
-        base_parsed = urlparse(base_url)
-        base_domain = base_parsed.netloc
-        if base_domain.startswith('www.'):
-            base_domain = base_domain[4:]
-            
-        links = set()
-        
-        for a_tag in soup.find_all('a', href=True):
-            href = a_tag['href']
-            full_url = urljoin(base_url, href)
-            
-            # Parse the full URL and get domain without www
-            full_parsed = urlparse(full_url)
-            full_domain = full_parsed.netloc
-            if full_domain.startswith('www.'):
-                full_domain = full_domain[4:]
-            
-            if is_valid_url(full_url) and full_domain == base_domain:
-                links.add(full_url)
-        
-        logger.debug(f"Found {len(links)} valid links on {base_url}")
-        return links
-    except Exception as e:
-        logger.error(f"Failed to extract links from {base_url}: {str(e)}")
-        return set()
+    rendered = page_cache.get_rendered(current_url)
+    from_cache = rendered is not None
+    if not from_cache:
+        host = urlparse(current_url).netloc
+        async with _host_limit(host_limits, host):
+            await _wait_for_crawl_delay(host, crawl_delay, host_schedule)
+            rendered = await render_pool.render(current_url)
+    if not rendered:
+        return None
+    logger.info("Successfully fetched content with Pyppeteer")
+    rendered['blocked'] = is_access_block_page(
+        rendered.get('title') or '',
+        rendered.get('description') or '',
+        '\n'.join(rendered.get('lines', []))
+    )
+    # Bot walls are not cached, or they would outlive the blocked-domain TTL
+    if not from_cache and not rendered['blocked']:
+        page_cache.store_rendered(current_url, rendered)
+    return rendered
 
-def is_content_sufficient(soup):
+async def _fetch_page(current_url, global_limit, host_limits, crawl_delay=None, host_schedule=None):
     """
-    Check if the scraped content is sufficient
-    Returns True if content seems valid, False if it might need JavaScript rendering
+    Fetch a single page, falling back to the browser pool when needed, and extract its content
+    Domains remembered as needing JavaScript go straight to the browser pool.
+    Returns dict(title, description, lines, links, blocked) or None if the page could not be fetched
     """
-    # Check for common indicators of insufficient content
-    if not soup.title:
-        return False
-    title = soup.title.string if soup.title else ""
-    meta_desc = soup.find('meta', attrs={'name': 'description'})
-    description = meta_desc['content'] if meta_desc else ""
-    visible_text = soup.get_text(" ", strip=True)
-    if is_access_block_page(title, description, visible_text):
-        return False
-    # Check if main content elements exist
-    main_content = soup.find_all(['h1', 'h2', 'h3', 'p', 'ul', 'ol', 'li', 'span'])
-    if len(main_content) < 3:  # If we have very few content elements
-        return False
-    # Check for common JavaScript-rendered content patterns
-    if soup.find('div', {'id': 'root'}) and not soup.find('div', {'id': 'root'}).get_text(strip=True):
-        return False
-    return True
+    strategy = domain_strategy.get(current_url)
+    page = None
 
-def prioritize_links(links):
-    priority_keywords = ['price', 'pricing', 'cost', 'plans', 'subscription']
-    prioritized = []
-    others = []
-    for link in links:
-        if any(keyword in link.lower() for keyword in priority_keywords):
-            prioritized.append(link)
-        else:
-            others.append(link)
-    # Prioritize links with keywords by putting them first
-    return prioritized + others
+    if strategy == STRATEGY_RENDER:
+        logger.info(f"Domain is known to need rendering, skipping plain fetch for {current_url}")
+    else:
+        page = await _fetch_static(current_url, global_limit, host_limits, crawl_delay, host_schedule)
+        if page is not None and page['sufficient']:
+            domain_strategy.record(current_url, STRATEGY_STATIC)
+        elif page is not None:
+            logger.info(f"Content seems insufficient, trying Pyppeteer for {current_url}")
+
+    if page is None or not page['sufficient']:
+        rendered = await _fetch_rendered(current_url, host_limits, crawl_delay, host_schedule)
+        if rendered:
+            # Blocked pages are judged per crawl, see crawl_site
+            if not rendered['blocked']:
+                domain_strategy.record(current_url, STRATEGY_RENDER)
+            page = rendered
+        elif strategy == STRATEGY_RENDER:
+            logger.warning(f"Pyppeteer failed for {current_url}, trying a plain fetch")
+            page = await _fetch_static(current_url, global_limit, host_limits, crawl_delay, host_schedule)
+        if page is None:
+            logger.warning(f"Both regular request and Pyppeteer failed for {current_url}")
+            return None
+        if page is not rendered:
+            logger.warning("Pyppeteer fallback failed, using original content")
 
-def trim_content(content, max_length):
+    return {
+        "title": page.get('title'),
+        "description": page.get('description'),
+        "lines": page.get('lines', []),
+        "links": filter_same_domain_links(page.get('links', []), current_url),
+        "blocked": page['blocked'],
+    }
+
+async def crawl_site(url, max_pages=1, task_id=None, data_type='business', agent_type=None, translate_content=True):
     """
-    Trim content to fit within max_length while preserving structure
+    Crawl a site concurrently, one frontier wave at a time
+    The frontier is a priority queue scored for the analysis mode and seeded with
+    sitemap URLs, so the first wave can fetch the whole page budget at once. Each wave
+    fetches the highest scoring URLs the remaining page budget allows; results are then
+    accepted in frontier order so crawls are reproducible. Lines already emitted by an
+    earlier page (menus, footers, banners) are dropped before translation, and the
+    token budget is shared fairly between the accepted pages once the crawl is done.
+    A blocked entry page, or a crawl where most fetched pages are blocked, marks the
+    domain blocked and ends the crawl; other blocked pages (e.g. a form behind a
+    CAPTCHA) are skipped.
+    Returns (all_content, visited_urls, budget_report)
     """
-    if len(content) <= max_length:
-        return content
-        
-    # Split content into lines to preserve structure
-    lines = content.split('\n')
-    trimmed_lines = []
-    current_length = 0
-    
-    for line in lines:
-        if current_length + len(line) + 1 <= max_length:  # +1 for newline
-            trimmed_lines.append(line)
-            current_length += len(line) + 1
-        else:
-            # If we can't fit the whole line, try to fit part of it
-            remaining_length = max_length - current_length
-            if remaining_length > 20:  # Only add partial line if we have enough space
-                trimmed_lines.append(line[:remaining_length] + "...")
-            break
-    
-    return '\n'.join(trimmed_lines)
+    if domain_strategy.get(url) == STRATEGY_BLOCKED:
+        raise Exception(
+            f"{url} recently returned a bot-protection or access-block page. "
+            f"Retry in about {max(domain_strategy.retry_after(url) // 60, 1)} minutes."
+        )
+
+    site = await discover_site(url)
+    frontier = Frontier(LinkScorer(data_type, agent_type), key=url_identity)
+    frontier.push(canonicalize_url(url), score=float('inf'))
+    for discovered_url in filter_same_domain_links(site["urls"], url):
+        frontier.push(canonicalize_url(discovered_url))
+    duplicates = NearDuplicateDetector()
+    boilerplate = BoilerplateFilter()
+    crawl_delay = site["crawl_delay"]
+    host_schedule = {}
+    visited_urls = []
+    all_content = []
+    global_limit = asyncio.Semaphore(CRAWL_CONCURRENCY)
+    host_limits = {}
+    entry_identity = url_identity(canonicalize_url(url))
+    pages_fetched = 0
+    pages_blocked = 0
+    blocked = False
+
+    while frontier and len(visited_urls) < max_pages and not blocked:
+        batch = frontier.pop_many(max_pages - len(visited_urls))
+        logger.debug(f"Fetching wave of {len(batch)} URLs")
+        results = await asyncio.gather(
+            *(
+                _fetch_page(batch_url, global_limit, host_limits, crawl_delay, host_schedule)
+                for batch_url in batch
+            ),
+            return_exceptions=True
+        )
+
+        fetched_pages = []
+        for current_url, result in zip(batch, results):
+            if isinstance(result, Exception):
+                logger.error(f"Error scraping {current_url}: {str(result)}")
+                continue
+            if result is None:
+                continue
+            pages_fetched += 1
+            if not result['blocked']:
+                fetched_pages.append((current_url, result, boilerplate.filter(result['lines'])))
+            elif url_identity(current_url) == entry_identity:
+                logger.warning(f"{current_url} is an access-block page, not crawling further")
+                # Kept so the analysis reports the site as unavailable instead of failing empty
+                fetched_pages.append((current_url, result, boilerplate.filter(result['lines'])))
+                blocked = True
+            else:
+                pages_blocked += 1
+                logger.warning(f"Skipping {current_url}, it is an access-block page")
+        if not blocked and pages_blocked * 2 > pages_fetched:
+            logger.warning(f"{pages_blocked} of {pages_fetched} pages of {url} are access-block pages, not crawling further")
+            blocked = True
+        if blocked:
+            domain_strategy.record(url, STRATEGY_BLOCKED)
+        logger.debug(f"Boilerplate filter has dropped {boilerplate.lines_dropped} lines so far")
+
+        # Building the page record may call the translation API, so run the wave concurrently
+        structured_pages = await asyncio.gather(
+            *(
+                asyncio.to_thread(
+                    build_structured_data, current_url, page['title'], page['description'], lines, translate_content
+                )
+                for current_url, page, lines in fetched_pages
+            ),
+            return_exceptions=True
+        )
 
-def scrape_url(url, max_pages=1, task_id=None):
+        for (current_url, page, _), structured_data in zip(fetched_pages, structured_pages):
+            if isinstance(structured_data, Exception):
+                logger.error(f"Error extracting content from {current_url}: {str(structured_data)}")
+                continue
+            page_links = page['links']
+            shingles = content_shingles(structured_data['content'])
+            duplicate = duplicates.find_duplicate(shingles)
+
+            if duplicate:
+                logger.info(f"Skipping {current_url}, near-duplicate of {duplicate[0]} (similarity {duplicate[1]:.2f})")
+            # Only add content if it's not empty
+            elif structured_data['content'].strip():
+                all_content.append(structured_data)
+                duplicates.add(current_url, shingles)
+                visited_urls.append(current_url)
+                # Update progress for each page scraped
+                if task_id:
+                    progress = min(10 + int(20 * len(visited_urls) / max_pages), 30)
+                    set_status(task_id, {"step": "scraping", "progress": progress, "message": f"Scraped {len(visited_urls)} of {max_pages} pages"})
+            else:
+                logger.warning(f"Skipping {current_url} due to empty content")
+
+            # Queue new links if we haven't reached max_pages
+            if len(visited_urls) < max_pages and not blocked:
+                added = sum(
+                    frontier.push(canonicalize_url(link), anchor_text)
+                    for link, anchor_text in sorted(page_links.items())
+                )
+                logger.debug(f"Added {added} new URLs to visit")
+
+    budget_report = apply_token_budget(all_content, MAX_CONTENT_TOKENS)
+    return all_content, visited_urls, budget_report
+
+def scrape_url(url, max_pages=1, task_id=None, data_type='business', agent_type=None, translate_content=True):
     """
     Scrape content from a given URL and its linked pages up to max_pages
+    translate_content translates Japanese pages to English (the translate pipeline)
     """
     logger.info(f"Starting scraping process for {url} with max_pages={max_pages}")
     try:
         if task_id:
             set_status(task_id, {"step": "scraping", "progress": 10, "message": "Scraping website content"})
-        visited_urls = set()
-        urls_to_visit = {url}
-        all_content = []
-        total_content_length = 0
-        
-        while urls_to_visit and len(visited_urls) < max_pages:
-            current_url = urls_to_visit.pop()
-            
-            if current_url in visited_urls:
-                logger.debug(f"Skipping already visited URL: {current_url}")
-                continue
-                
-            try:
-                logger.info(f"Scraping URL: {current_url}")
-                headers = get_random_headers()
-                
-                # Add a small random delay between requests
-                delay = random.uniform(1, 3)
-                logger.debug(f"Waiting {delay:.2f} seconds before request")
-                time.sleep(delay)
-                
-                # First attempt with regular requests
-                try:
-                    response = requests.get(current_url, headers=headers, timeout=10)
-                    response.raise_for_status()
-                    soup = BeautifulSoup(response.text, 'html.parser')
-                except requests.exceptions.RequestException as e:
-                    logger.warning(f"Regular request failed for {current_url}, trying Pyppeteer: {str(e)}")
-                    html = run_pyppeteer(current_url)
-                    if html:
-                        soup = BeautifulSoup(html, 'html.parser')
-                        logger.info("Successfully fetched content with Pyppeteer")
-                    else:
-                        logger.warning(f"Both regular request and Pyppeteer failed for {current_url}")
-                        continue
-                
-                # Check if content seems sufficient
-                if not is_content_sufficient(soup):
-                    logger.info(f"Content seems insufficient, trying Pyppeteer for {current_url}")
-                    html = run_pyppeteer(current_url)
-                    if html:
-                        soup = BeautifulSoup(html, 'html.parser')
-                        logger.info("Successfully fetched content with Pyppeteer")
-                    else:
-                        logger.warning("Pyppeteer fallback failed, using original content")
-                
-                # Extract structured content
-                structured_data = extract_structured_content(soup, current_url)
-                current_content_length = len(structured_data['content']) + len(structured_data['description'])
-                
-                # Only add content if it's not empty
-                if structured_data['content'].strip():
-                    # If this is the first page and content exceeds MAX_CONTENT_LENGTH, trim it
-                    if len(visited_urls) == 0 and current_content_length > MAX_CONTENT_LENGTH:
-                        logger.warning(f"First page content exceeds MAX_CONTENT_LENGTH, trimming content")
-                        # Calculate how much content we can keep
-                        available_length = MAX_CONTENT_LENGTH - len(structured_data['description'])
-                        structured_data['content'] = trim_content(structured_data['content'], available_length)
-                        current_content_length = len(structured_data['content']) + len(structured_data['description'])
-                    
-                    # Check if adding this content would exceed the limit for subsequent pages
-                    if total_content_length + current_content_length > MAX_CONTENT_LENGTH:
-                        logger.warning(f"Content length limit reached ({total_content_length} + {current_content_length} > {MAX_CONTENT_LENGTH}). Skipping remaining pages.")
-                        break
-                    
-                    all_content.append(structured_data)
-                    total_content_length += current_content_length
-                    visited_urls.add(current_url)
-                    # Update progress for each page scraped
-                    if task_id:
-                        progress = min(10 + int(20 * len(visited_urls) / max_pages), 30)
-                        set_status(task_id, {"step": "scraping", "progress": progress, "message": f"Scraped {len(visited_urls)} of {max_pages} pages"})
-                else:
-                    logger.warning(f"Skipping {current_url} due to empty content")
-                
-                # Get new links if we haven't reached max_pages
-                if len(visited_urls) < max_pages:
-                    new_links = get_links(soup, current_url)
-                    prioritized_links = prioritize_links(new_links - visited_urls)
-                    # Use a list to maintain order, and add prioritized links to the front
-                    urls_to_visit = list(prioritized_links) + list(urls_to_visit)
-                    urls_to_visit = set(urls_to_visit)  # Convert back to set if you want to avoid duplicates
-                    logger.debug(f"Added {len(new_links - visited_urls)} new URLs to visit")
-                    
-            except Exception as e:
-                logger.error(f"Error scraping {current_url}: {str(e)}")
-                continue
+        all_content, visited_urls, budget_report = run_coroutine(
+            crawl_site(
+                url,
+                max_pages,
+                task_id=task_id,
+                data_type=data_type,
+                agent_type=agent_type,
+                translate_content=translate_content
+            )
+        )
         
         if not all_content:
             error_msg = f"No content could be scraped from {url}. The website might be blocking automated access or the content is not accessible."
@@ -452,7 +457,11 @@ def scrape_url(url, max_pages=1, task_id=None):
                 set_status(task_id, {"step": "error", "progress": 100, "message": error_msg})
             raise Exception(error_msg)
             
-        logger.info(f"Completed scraping {len(visited_urls)} pages, total content length: {total_content_length}")
+        logger.info(
+            f"Completed scraping {len(visited_urls)} pages, content tokens used: "
+            f"{budget_report['used_tokens']} of {budget_report['max_tokens']} "
+            f"({budget_report['pages_trimmed']} pages trimmed to their fair share)"
+        )
         if task_id:
             set_status(task_id, {"step": "business_overview", "progress": 33, "message": "Creating business overview"})
         return all_content
@@ -472,11 +481,13 @@ def build_combined_content(content):
             domain = parsed_url.netloc
             if domain.startswith('www.'):
                 domain = domain[4:]
-        is_blocked_page = is_access_block_page(
-            page.get('title', ''),
-            page.get('description', ''),
-            page.get('content', '')
-        )
+        is_blocked_page = page.get('blocked')
+        if is_blocked_page is None:
+            is_blocked_page = is_access_block_page(
+                page.get('title', ''),
+                page.get('description', ''),
+                page.get('content', '')
+            )
         formatted_content.append(f"URL: {page['url']}")
         formatted_content.append(
             "Title: ACCESS BLOCKED"
@@ -500,34 +511,121 @@ def build_combined_content(content):
         formatted_content.append("\n---\n")
     return "\n".join(formatted_content), domain
 
-def call_openai(client, prompt, models=None):
+def prompt_messages(prompt):
+    """
+    Chat messages for a prompt given either as plain text or as a list of messages
+    """
+    if isinstance(prompt, str):
+        return [{"role": "user", "content": prompt}]
+    return prompt
+
+def stream_openai(client, model, messages, on_field=None, on_first_chunk=None):
+    """
+    Stream one completion, passing each top-level JSON field to on_field as soon as it is complete
+    on_first_chunk is called once the first chunk arrives, i.e. once the prompt has been processed
+    Returns the full response text, the seconds until its first token and the usage reported last
+    """
+    parser = StreamingJSONObject()
+    parts = []
+    first_token_seconds = None
+    usage = None
+    started = time.monotonic()
+    stream = client.chat.completions.create(
+        extra_body={},
+        model=model,
+        messages=messages,
+        stream=True,
+        stream_options={"include_usage": True}
+    )
+    for chunk in stream:
+        if on_first_chunk is not None:
+            on_first_chunk()
+            on_first_chunk = None
+        # Usage arrives on the final chunk (Groq also reports it under x_groq)
+        chunk_usage = chunk.usage or (getattr(chunk, 'x_groq', None) or {}).get('usage')
+        if chunk_usage:
+            usage = chunk_usage
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta.content
+        if not delta:
+            continue
+        if first_token_seconds is None:
+            first_token_seconds = time.monotonic() - started
+        parts.append(delta)
+        if on_field is not None:
+            for key, value in parser.feed(delta):
+                on_field(key, value)
+    if not parts:
+        logger.error(f"OpenAI API streamed an empty response for model {model}")
+        raise Exception(f"Empty response from OpenAI API for model {model}")
+    return "".join(parts), first_token_seconds, usage
+
+def wait_for_prompt_prefix(prefix_cached):
+    """
+    Hold back a call until the first call of the analysis has had its prompt processed,
+    so the shared prefix is in the provider's cache; bounded by PREFIX_CACHE_WAIT_SECONDS
+    """
+    if LLM_STREAMING and not prefix_cached.wait(PREFIX_CACHE_WAIT_SECONDS):
+        logger.debug("Prompt prefix not confirmed cached in time, sending call anyway")
+
+def call_openai(client, prompt, models=None, on_field=None, on_prompt_processed=None):
     """
     Call OpenAI API with a list of models. Try each model in order until one succeeds.
     Args:
         client: OpenAI client instance
-        prompt: The prompt to send
+        prompt: The prompt to send, as text or as chat messages (see build_prompt_messages)
         models: List of model names to try (if None, use default list)
+        on_field: Optional callback(key, value) for each top-level field of the JSON
+            response as it completes; the completion is streamed when set
+        on_prompt_processed: Optional callback run once the provider has processed the
+            prompt (first streamed chunk), so calls sharing its prefix can hit the prompt cache
     Returns:
         The content of the first successful completion
     Raises:
         Exception if all models fail
     """
     if models is None:
-        models = [
-            "openai/gpt-oss-120b",
-            # "openai/gpt-oss-20b",
-            # "llama-3.3-70b-versatile",
-            # "llama-3.1-8b-instant",
-        ]
+        models = DEFAULT_MODELS
+    stream = LLM_STREAMING and (on_field is not None or on_prompt_processed is not None)
+    messages = prompt_messages(prompt)
+    prompt_length = sum(len(message["content"]) for message in messages)
     errors = []
     for model in models:
         try:
-            logger.info(f"Trying model: {model} with prompt length: {len(prompt)}")
-            completion = client.chat.completions.create(
-                extra_body={},
-                model=model,
-                messages=[{"role": "user", "content": prompt}]
+            prompt_tokens = sum(estimate_tokens(message["content"]) for message in messages)
+            logger.info(
+                f"Trying model: {model} with prompt length: {prompt_length}, "
+                f"~{prompt_tokens} tokens used, ~{MODEL_CONTEXT_TOKENS - prompt_tokens} of {MODEL_CONTEXT_TOKENS} available"
             )
+            # Shared cap on completions in flight across all running analyses
+            with stage_limiter.slot("llm"):
+                started = time.monotonic()
+                first_token_seconds = None
+                try:
+                    if stream:
+                        content, first_token_seconds, usage = stream_openai(
+                            client, model, messages, on_field=on_field, on_first_chunk=on_prompt_processed
+                        )
+                    else:
+                        completion = client.chat.completions.create(
+                            extra_body={},
+                            model=model,
+                            messages=messages
+                        )
+                        usage = getattr(completion, 'usage', None)
+                except Exception:
+                    llm_client.record_call(model, time.monotonic() - started, failed=True)
+                    raise
+                llm_client.record_call(
+                    model,
+                    time.monotonic() - started,
+                    first_token_seconds=first_token_seconds,
+                    usage=usage
+                )
+            if stream:
+                logger.info(f"Model {model} succeeded (first token after {first_token_seconds:.2f}s).")
+                return content
             if not completion:
                 logger.error(f"OpenAI API returned None completion object for model {model}")
                 raise Exception(f"OpenAI API returned None completion object for model {model}")
@@ -592,7 +690,9 @@ def process_content(
     response_language='en',
     data_type='business',
     agent_type=None,
-    include_brand_intelligence=False
+    include_brand_intelligence=False,
+    translation_mode=None,
+    timer=None
 ):
     """
     Process the content using OpenAI API and return the analysis
@@ -602,11 +702,45 @@ def process_content(
         response_language: Language for the response ('en' or 'ja')
         data_type: The analysis mode ('business' or 'university')
         agent_type: Canonical agent type key when data_type is 'university'
+        translation_mode: 'native' to generate directly in response_language,
+            'translate' to generate in English and translate the result
+        timer: Optional StageTimer collecting per-stage timings
     """
     logger.info("Starting content processing with OpenAI")
+    translation_mode = translation_mode or TRANSLATION_MODE
+    timer = timer or StageTimer()
+    native = translation_mode == TRANSLATION_MODE_NATIVE
+    # Native prompts carry the response language; translate mode always asks for English
+    prompt_language = response_language if native else None
+    translate_result = not native and response_language == 'ja'
     try:
-        client = get_openai_client()
         combined_content, domain = build_combined_content(content)
+        # In translate mode results are cached before translation so every response_language shares them
+        cache_key = make_result_key(
+            combined_content,
+            UNIVERSITY_PROMPT_VERSION if data_type == 'university' else PROMPT_VERSION,
+            DEFAULT_MODELS,
+            data_type,
+            agent_type=agent_type,
+            include_brand_intelligence=include_brand_intelligence,
+            response_language=prompt_language
+        )
+        cached_result = result_cache.get(cache_key)
+        if cached_result is not None:
+            logger.info("Using cached analysis result for identical content")
+            if translate_result:
+                logger.info("Translating cached data to Japanese")
+                with timer.stage("translate_result"):
+                    cached_result = translate_data_to_japanese(cached_result)
+            if task_id:
+                set_status(task_id, {"step": "done", "progress": 100, "message": "Analysis complete", "result": cached_result})
+            return cached_result
+
+        client = get_openai_client()
+        # The first call caches the shared prompt prefix; the others start once it has been processed
+        prefix_cached = threading.Event()
+        # Partial results are only published when they are already in the response language
+        publisher = PartialResultPublisher(task_id, enabled=not translate_result)
 
         if data_type == 'university':
             if not agent_type or agent_type not in UNIVERSITY_AGENT_TYPES:
@@ -614,30 +748,39 @@ def process_content(
             agent_meta = UNIVERSITY_AGENT_TYPES[agent_type]
 
             if task_id:
-                set_status(task_id, {
+                publisher.set_step({
                     "step": "general_knowledge",
                     "progress": 35,
                     "message": "Compiling shared university insights"
                 })
 
-            general_prompt = get_university_general_prompt(combined_content, domain)
-            specialized_prompt = get_university_specialized_prompt(agent_type, combined_content, domain)
+            general_prompt = get_university_general_prompt(combined_content, domain, prompt_language)
+            specialized_prompt = get_university_specialized_prompt(agent_type, combined_content, domain, prompt_language)
 
             def general_call():
                 logger.debug("Sending university general knowledge OpenAI API request")
-                return call_openai(client, general_prompt)
+                try:
+                    return call_openai(
+                        client,
+                        general_prompt,
+                        on_field=publisher.field_callback("generalKnowledge"),
+                        on_prompt_processed=prefix_cached.set
+                    )
+                finally:
+                    prefix_cached.set()
 
             def specialized_call():
+                wait_for_prompt_prefix(prefix_cached)
                 logger.debug(f"Sending specialized OpenAI API request for {agent_meta['display_name']}")
                 if task_id:
-                    set_status(task_id, {
+                    publisher.set_step({
                         "step": "specialized_knowledge",
                         "progress": 55,
                         "message": f"Gathering {agent_meta['display_name']} focus"
                     })
-                return call_openai(client, specialized_prompt)
+                return call_openai(client, specialized_prompt, on_field=publisher.field_callback("specializedKnowledge"))
 
-            with ThreadPoolExecutor(max_workers=2) as executor:
+            with timer.stage("llm"), ThreadPoolExecutor(max_workers=2) as executor:
                 future_general = executor.submit(general_call)
                 future_specialized = executor.submit(specialized_call)
                 general_response = future_general.result()
@@ -657,10 +800,12 @@ def process_content(
                 "generalKnowledge": general_result,
                 "specializedKnowledge": specialized_result,
             }
+            result_cache.set(cache_key, combined_result)
 
-            if response_language == 'ja':
+            if translate_result:
                 logger.info("Translating university data to Japanese")
-                combined_result = translate_data_to_japanese(combined_result)
+                with timer.stage("translate_result"):
+                    combined_result = translate_data_to_japanese(combined_result)
 
             debug_file = save_data_with_rotation(
                 {
@@ -673,7 +818,7 @@ def process_content(
             )
 
             if task_id:
-                set_status(task_id, {
+                publisher.set_step({
                     "step": "agent_profile",
                     "progress": 80,
                     "message": f"Formatting {agent_meta['display_name']} knowledge"
@@ -690,47 +835,61 @@ def process_content(
 
         # Default business analysis flow
         if task_id:
-            set_status(task_id, {
+            publisher.set_step({
                 "step": "business_overview",
                 "progress": 33,
                 "message": "Creating business overview"
             })
 
-        main_prompt = get_analysis_prompt().replace("{{WEBSITE_SCRAPED_CONTENT}}", combined_content).replace("${domain}", domain)
-        faq_prompt = get_faq_prompt().replace("{{WEBSITE_SCRAPED_CONTENT}}", combined_content)
+        # Every call leads with the same scraped-content block so the provider's prefix cache is shared
+        main_prompt = build_prompt_messages(
+            apply_response_language(get_analysis_prompt(), prompt_language).replace("${domain}", domain),
+            combined_content
+        )
+        faq_prompt = build_prompt_messages(apply_response_language(get_faq_prompt(), prompt_language), combined_content)
         brand_intelligence_prompt = None
 
         if include_brand_intelligence:
-            brand_intelligence_prompt = get_brand_intelligence_prompt().replace(
-                "{{WEBSITE_SCRAPED_CONTENT}}",
+            brand_intelligence_prompt = build_prompt_messages(
+                apply_response_language(get_brand_intelligence_prompt(), prompt_language),
                 combined_content
             )
 
         def main_call():
             logger.debug("Sending main OpenAI API request")
             if task_id:
-                set_status(task_id, {
+                publisher.set_step({
                     "step": "services_products",
                     "progress": 50,
                     "message": "Analyzing services & products"
                 })
-            return call_openai(client, main_prompt)
+            try:
+                return call_openai(
+                    client,
+                    main_prompt,
+                    on_field=publisher.field_callback(),
+                    on_prompt_processed=prefix_cached.set
+                )
+            finally:
+                prefix_cached.set()
 
         def faq_call():
+            wait_for_prompt_prefix(prefix_cached)
             logger.debug("Sending FAQ OpenAI API request")
-            return call_openai(client, faq_prompt)
+            return call_openai(client, faq_prompt, on_field=publisher.field_callback(keys={"faqs", "vision", "mission"}))
 
         def brand_intelligence_call():
+            wait_for_prompt_prefix(prefix_cached)
             logger.debug("Sending brand intelligence OpenAI API request")
             if task_id:
-                set_status(task_id, {
+                publisher.set_step({
                     "step": "brand_intelligence",
                     "progress": 60,
                     "message": "Inferring brand intelligence"
                 })
-            return call_openai(client, brand_intelligence_prompt)
+            return call_openai(client, brand_intelligence_prompt, on_field=publisher.field_callback("brandIntelligence"))
 
-        with ThreadPoolExecutor(max_workers=3 if include_brand_intelligence else 2) as executor:
+        with timer.stage("llm"), ThreadPoolExecutor(max_workers=3 if include_brand_intelligence else 2) as executor:
             future_main = executor.submit(main_call)
             future_faq = executor.submit(faq_call)
             future_brand_intelligence = None
@@ -774,10 +933,12 @@ def process_content(
             main_result["mission"] = faq_result["mission"]
         if brand_intelligence_result:
             main_result["brandIntelligence"] = brand_intelligence_result
+        result_cache.set(cache_key, main_result)
 
-        if response_language == 'ja':
+        if translate_result:
             logger.info("Translating data to Japanese")
-            main_result = translate_data_to_japanese(main_result)
+            with timer.stage("translate_result"):
+                main_result = translate_data_to_japanese(main_result)
 
         debug_file = save_data_with_rotation(
             {
@@ -790,9 +951,9 @@ def process_content(
         )
 
         if task_id:
-            set_status(task_id, {"step": "unique_selling_points", "progress": 66, "message": "Identifying unique selling points"})
-            set_status(task_id, {"step": "brand_voice", "progress": 80, "message": "Determining brand voice"})
-            set_status(task_id, {"step": "sales_qa", "progress": 90, "message": "Generating sales Q&A"})
+            publisher.set_step({"step": "unique_selling_points", "progress": 66, "message": "Identifying unique selling points"})
+            publisher.set_step({"step": "brand_voice", "progress": 80, "message": "Determining brand voice"})
+            publisher.set_step({"step": "sales_qa", "progress": 90, "message": "Generating sales Q&A"})
             set_status(task_id, {"step": "done", "progress": 100, "message": "Analysis complete", "result": main_result})
         logger.debug(f"Saved model response to {debug_file}")
         logger.info("Successfully processed content with OpenAI")
@@ -810,7 +971,8 @@ def analyze_url(
     response_language='en',
     data_type='business',
     agent_type=None,
-    include_brand_intelligence=False
+    include_brand_intelligence=False,
+    translation_mode=None
 ):
     """
     Scrape URL and analyze its content
@@ -821,10 +983,21 @@ def analyze_url(
         response_language: Language for the response ('en' or 'ja')
         data_type: The analysis mode ('business' or 'university')
         agent_type: Canonical agent type key when data_type is 'university'
+        translation_mode: 'native' or 'translate'; defaults to TRANSLATION_MODE
     """
     logger.info(f"Starting URL analysis for {url}")
+    translation_mode = translation_mode or TRANSLATION_MODE
+    timer = StageTimer()
     try:
-        content = scrape_url(url, max_pages, task_id=task_id)
+        with timer.stage("scrape"):
+            content = scrape_url(
+                url,
+                max_pages,
+                task_id=task_id,
+                data_type=data_type,
+                agent_type=agent_type,
+                translate_content=translation_mode == TRANSLATION_MODE_TRANSLATE
+            )
         # Only process if we have content
         if not content:
             logger.warning(f"No content found for {url}")
@@ -843,8 +1016,11 @@ def analyze_url(
             response_language=response_language,
             data_type=data_type,
             agent_type=agent_type,
-            include_brand_intelligence=include_brand_intelligence
+            include_brand_intelligence=include_brand_intelligence,
+            translation_mode=translation_mode,
+            timer=timer
         )
+        pipeline_metrics.record(translation_mode, response_language, timer)
         logger.info(f"Successfully completed URL analysis for {url}")
         return result, 200
     except Exception as e:
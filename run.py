@@ -20,10 +20,14 @@ else:
 from flask import Flask
 from flask_cors import CORS
 from app.routes import main
+from app.llm_client import llm_client, LLM_PREWARM
 
 app = Flask(__name__)
 CORS(app, resources={r"/api/*": {"origins": ["*"]}})
 app.register_blueprint(main)
 
+if LLM_PREWARM:
+    llm_client.prewarm()
+
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5000)
\ No newline at end of file
@@ -0,0 +1,62 @@
+import pytest
+
+from app.dedupe import NearDuplicateDetector, canonicalize_url, content_shingles, url_identity
+
+
+@pytest.mark.parametrize("url, expected", [
+    ("https://example.com", "https://example.com/"),
+    ("HTTPS://Example.COM:443/About", "https://example.com/About"),
+    ("http://example.com:80/a", "http://example.com/a"),
+    ("http://example.com:8080/a", "http://example.com:8080/a"),
+    ("https://example.com/a#team", "https://example.com/a"),
+    ("https://example.com/a?utm_source=x&gclid=1&fbclid=2", "https://example.com/a"),
+    ("https://example.com/a?b=2&utm_medium=y&a=1", "https://example.com/a?a=1&b=2"),
+    ("  https://example.com/a?q=  ", "https://example.com/a?q="),
+])
+def test_canonicalize_url(url, expected):
+    assert canonicalize_url(url) == expected
+
+
+@pytest.mark.parametrize("url", [
+    "https://example.com/about",
+    "https://example.com/about/",
+    "https://example.com/about#team",
+    "https://example.com/about?utm_source=x",
+    "http://example.com/about",
+    "https://www.example.com/about",
+    "https://example.com/about/index.html",
+    "https://EXAMPLE.com:443/about/",
+])
+def test_url_identity_of_the_same_page(url):
+    assert url_identity(url) == "example.com/about"
+
+
+def test_url_identity_of_the_home_page():
+    assert {
+        url_identity("https://example.com"),
+        url_identity("https://example.com/"),
+        url_identity("http://www.example.com/index.php"),
+    } == {"example.com/"}
+
+
+def test_url_identity_keeps_distinct_pages_apart():
+    assert url_identity("https://example.com/about") != url_identity("https://example.com/contact")
+    assert url_identity("https://example.com/blog?page=2") == "example.com/blog?page=2"
+    assert url_identity("https://example.com/blog?page=2") != url_identity("https://example.com/blog")
+
+
+def test_near_duplicate_pages_are_detected():
+    detector = NearDuplicateDetector()
+    body = (
+        "P: We plan, design and build websites and mobile apps for small businesses.\n"
+        "P: Every project starts with a free consultation about your goals and budget.\n"
+        "LI: Responsive layouts that work on phones, tablets and desktops\n"
+        "LI: Search engine optimisation and analytics from day one\n"
+        "LI: Hosting, backups and security updates included for the first year\n"
+        "P: Our support team answers questions by email or phone within one business day."
+    )
+    detector.add("https://example.com/en/", content_shingles(f"H1: Our Services in Tokyo\n{body}"))
+    # Same localized template for another city, with different whitespace and case
+    match = detector.find_duplicate(content_shingles(f"H1: OUR SERVICES IN   OSAKA\n{body}"))
+    assert match is not None and match[0] == "https://example.com/en/"
+    assert detector.find_duplicate(content_shingles("H1: Contact\nP: Call us any time.")) is None
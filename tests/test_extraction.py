@@ -0,0 +1,22 @@
+import pytest
+
+from app.extraction import extract_page
+
+pytest.importorskip("lxml")
+
+
+@pytest.mark.parametrize("body", ["", "   ", "\n\t\r\n", "<!-- nothing here -->"])
+def test_blank_body_is_insufficient_with_lxml(body):
+    page = extract_page(body, backend="lxml")
+    assert page["sufficient"] is False
+    assert page["blocked"] is False
+    assert page["title"] == ""
+    assert page["lines"] == []
+    assert page["links"] == []
+
+
+@pytest.mark.parametrize("body", ["", "   "])
+def test_blank_body_is_insufficient_with_bs4(body):
+    page = extract_page(body, backend="bs4")
+    assert page["sufficient"] is False
+    assert page["lines"] == []
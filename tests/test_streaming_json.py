@@ -0,0 +1,48 @@
+from app.streaming_json import StreamingJSONObject
+
+
+def feed_by_character(text):
+    parser = StreamingJSONObject()
+    fields = []
+    for ch in text:
+        fields.extend(parser.feed(ch))
+    return parser, fields
+
+
+def test_fields_after_prose_and_code_fence():
+    text = (
+        'Sure, here is the analysis:\n```json\n'
+        '{"businessOverview": "We say \\"hi\\" {not a brace} [or a bracket], ok",\n'
+        ' "uniqueSellingPoints": ["fast", {"note": "} and ]"}],\n'
+        ' "nested": {"a": {"b": [1, 2]}},\n'
+        ' "count": 3}\n```'
+    )
+    parser, fields = feed_by_character(text)
+    assert fields == [
+        ("businessOverview", 'We say "hi" {not a brace} [or a bracket], ok'),
+        ("uniqueSellingPoints", ["fast", {"note": "} and ]"}]),
+        ("nested", {"a": {"b": [1, 2]}}),
+        ("count", 3),
+    ]
+    assert parser.done
+
+
+def test_field_is_returned_once_its_value_is_complete():
+    parser = StreamingJSONObject()
+    assert parser.feed('{"first": "val') == []
+    assert parser.feed('ue"') == []
+    assert parser.feed(', "second"') == [("first", "value")]
+    assert parser.feed(': [1, ') == []
+    assert parser.feed('2]}') == [("second", [1, 2])]
+
+
+def test_escaped_quote_in_key_and_raw_newline_in_value():
+    _, fields = feed_by_character('{"say \\"hi\\"": "line one\nline two"}')
+    assert fields == [('say "hi"', "line one\nline two")]
+
+
+def test_text_after_the_object_is_ignored():
+    parser = StreamingJSONObject()
+    assert parser.feed('{"a": true}') == [("a", True)]
+    assert parser.feed(', "b": false}') == []
+    assert parser.done
@@ -0,0 +1,61 @@
+import pytest
+
+from app import token_budget
+from app.token_budget import allocate_fair_shares, estimate_tokens, trim_to_tokens
+
+
+@pytest.fixture
+def heuristic_estimator(monkeypatch):
+    # Exact token counts depend on tiktoken being installed; the heuristic is deterministic
+    monkeypatch.setattr(token_budget, "_encoding", None)
+
+
+@pytest.mark.parametrize("needs, budget, expected", [
+    ([10, 100, 100], 150, [10, 70, 70]),
+    ([100, 10, 100], 150, [70, 10, 70]),
+    ([10, 20], 100, [10, 20]),
+    ([50, 50, 50], 90, [30, 30, 30]),
+    ([5, 5], 0, [0, 0]),
+    ([], 100, []),
+])
+def test_allocate_fair_shares(needs, budget, expected):
+    assert allocate_fair_shares(needs, budget) == expected
+
+
+def test_allocate_fair_shares_never_exceeds_budget_or_need():
+    needs = [3, 400, 17, 90, 1200, 0, 55]
+    allocations = allocate_fair_shares(needs, 500)
+    assert sum(allocations) <= 500
+    assert all(0 <= allocation <= need for allocation, need in zip(allocations, needs))
+    # Pages under the equal share keep everything
+    assert allocations[0] == 3 and allocations[2] == 17 and allocations[5] == 0
+
+
+def test_text_within_budget_is_unchanged(heuristic_estimator):
+    text = "Short line.\nAnother one."
+    assert trim_to_tokens(text, 100) == text
+
+
+def test_whole_lines_are_kept(heuristic_estimator):
+    assert trim_to_tokens("aaaaaaaa\nbbbbbbbb\ncccccccc", 6) == "aaaaaaaa\nbbbbbbbb"
+
+
+def test_partial_line_ends_at_sentence_boundary(heuristic_estimator):
+    text = "First sentence here. Second sentence is longer and goes on."
+    assert trim_to_tokens(text, 8) == "First sentence here."
+
+
+def test_partial_line_without_sentence_end_is_cut_at_a_word(heuristic_estimator):
+    text = "alpha beta gamma delta epsilon zeta eta theta"
+    assert trim_to_tokens(text, 7) == "alpha beta gamma delta..."
+
+
+def test_japanese_is_cut_at_sentence_boundary(heuristic_estimator):
+    text = "これは最初の文です。これは二番目の文です。"
+    assert trim_to_tokens(text, 12) == "これは最初の文です。"
+
+
+@pytest.mark.parametrize("max_tokens", [1, 5, 20, 60])
+def test_trimmed_text_fits_the_budget(heuristic_estimator, max_tokens):
+    text = "\n".join(f"Line {i} has a few words. And a second sentence." for i in range(20))
+    assert estimate_tokens(trim_to_tokens(text, max_tokens)) <= max_tokens